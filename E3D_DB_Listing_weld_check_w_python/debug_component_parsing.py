@@ -3,8 +3,11 @@ from pathlib import Path
 
 # Quick test to see if we're parsing components with positions
 file_path = Path(r"C:\Users\szil\Repos\excel_wizadry\E3D_DB_Listing_weld_check_w_python\TBY\TBY-0AUX-P.txt")
-kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-branch_pattern = r'/B\d+'
+kks_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}')
+full_branch_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}/B\d+')
+branch_pattern = re.compile(r'/B\d+')
+spre_pattern = re.compile(r'SPRE\s+(\S+)')
+pos_pattern = re.compile(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
 
 current_pipe = None
 current_branch = None
@@ -14,24 +17,24 @@ count = 0
 with open(file_path, 'r', encoding='utf-8') as f:
     for line in f:
         if 'NEW PIPE' in line:
-            match = re.search(kks_pattern, line)
+            match = kks_pattern.search(line)
             if match:
                 current_pipe = match.group()
                 current_branch = None
                 current_component = None
         
         elif 'NEW BRANCH' in line and current_pipe:
-            full_match = re.search(kks_pattern + branch_pattern, line)
+            full_match = full_branch_pattern.search(line)
             if full_match:
                 full_branch = full_match.group()
-                branch_match = re.search(branch_pattern, full_branch)
+                branch_match = branch_pattern.search(full_branch)
                 if branch_match:
                     current_branch = branch_match.group()
                     current_component = None
         
         elif current_pipe and current_branch:
             if line.strip().startswith('SPRE '):
-                spre_match = re.search(r'SPRE\s+(\S+)', line)
+                spre_match = spre_pattern.search(line)
                 if spre_match:
                     spre = spre_match.group(1)
                     if current_component is None:
@@ -40,7 +43,7 @@ with open(file_path, 'r', encoding='utf-8') as f:
                         current_component['spre'] = spre
             
             elif line.strip().startswith('POS '):
-                pos_match = re.search(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
+                pos_match = pos_pattern.search(line)
                 if pos_match and current_component:
                     count += 1
                     if count <= 5:
@@ -2,8 +2,13 @@ import re
 
 # Simulate extract_branch_positions to see if HCON/TCON are being extracted
 file_path = r'C:\Users\szil\Repos\excel_wizadry\E3D_DB_Listing_weld_check_w_python\TBY\TBY-0AUX-P.txt'
-kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-branch_pattern = r'/B\d+'
+kks_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}')
+full_branch_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}/B\d+')
+branch_pattern = re.compile(r'/B\d+')
+hcon_pattern = re.compile(r'HCON\s+(\S+)')
+tcon_pattern = re.compile(r'TCON\s+(\S+)')
+hpos_pattern = re.compile(r'HPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
+tpos_pattern = re.compile(r'TPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
 
 branches = []
 current_pipe = None
@@ -16,7 +21,7 @@ with open(file_path, 'r', encoding='utf-8') as f:
     for line in f:
         # Check if line contains "NEW PIPE"
         if 'NEW PIPE' in line:
-            match = re.search(kks_pattern, line)
+            match = kks_pattern.search(line)
             if match:
                 current_pipe = match.group()
                 current_branch = None
@@ -28,10 +33,10 @@ with open(file_path, 'r', encoding='utf-8') as f:
             if current_branch_info and current_branch_info.get('Pipe'):
                 branches.append(current_branch_info.copy())
             
-            full_match = re.search(kks_pattern + branch_pattern, line)
+            full_match = full_branch_pattern.search(line)
             if full_match:
                 full_branch = full_match.group()
-                branch_match = re.search(branch_pattern, full_branch)
+                branch_match = branch_pattern.search(full_branch)
                 if branch_match:
                     current_branch = branch_match.group()
                     current_branch_info = {
@@ -52,7 +57,7 @@ with open(file_path, 'r', encoding='utf-8') as f:
         # Extract HCON, TCON, HPOS, TPOS
         elif in_branch and current_branch_info:
             if line.strip().startswith('HCON '):
-                hcon_match = re.search(r'HCON\s+(\S+)', line)
+                hcon_match = hcon_pattern.search(line)
                 if hcon_match:
                     current_branch_info['HCON'] = hcon_match.group(1)
                     count += 1
@@ -60,21 +65,21 @@ with open(file_path, 'r', encoding='utf-8') as f:
                         print(f"Found HCON: {current_branch_info['Full_Branch_ID']} = {current_branch_info['HCON']}")
             
             elif line.strip().startswith('TCON '):
-                tcon_match = re.search(r'TCON\s+(\S+)', line)
+                tcon_match = tcon_pattern.search(line)
                 if tcon_match:
                     current_branch_info['TCON'] = tcon_match.group(1)
                     if count <= 5:
                         print(f"Found TCON: {current_branch_info['Full_Branch_ID']} = {current_branch_info['TCON']}")
             
             elif line.strip().startswith('HPOS '):
-                hpos_match = re.search(r'HPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
+                hpos_match = hpos_pattern.search(line)
                 if hpos_match:
                     current_branch_info['HPOS_X'] = float(hpos_match.group(1))
                     current_branch_info['HPOS_Y'] = float(hpos_match.group(2))
                     current_branch_info['HPOS_Z'] = float(hpos_match.group(3))
             
             elif line.strip().startswith('TPOS '):
-                tpos_match = re.search(r'TPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
+                tpos_match = tpos_pattern.search(line)
                 if tpos_match:
                     current_branch_info['TPOS_X'] = float(tpos_match.group(1))
                     current_branch_info['TPOS_Y'] = float(tpos_match.group(2))
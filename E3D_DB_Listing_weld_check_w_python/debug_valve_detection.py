@@ -55,8 +55,9 @@ print(f"\n0QCQ10BR100/B1 in connected_branches.csv: {len(branch_0QCQ)} entries")
 
 # Parse TXT file to find VALVE position
 txt_file = Path(r"C:\Users\szil\Repos\excel_wizadry\E3D_DB_Listing_weld_check_w_python\TBY\TBY-0AUX-P.txt")
-kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-branch_pattern = r'/B\d+'
+kks_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}')
+full_branch_pattern = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}/B\d+')
+branch_pattern = re.compile(r'/B\d+')
 
 current_pipe = None
 current_branch = None
@@ -65,16 +66,16 @@ in_0QCQ = False
 with open(txt_file, 'r', encoding='utf-8') as f:
     for line in f:
         if 'NEW PIPE' in line:
-            match = re.search(kks_pattern, line)
+            match = kks_pattern.search(line)
             if match:
                 current_pipe = match.group()
                 in_0QCQ = (current_pipe == '0QCQ10BR100')
         
         elif 'NEW BRANCH' in line and current_pipe:
-            full_match = re.search(kks_pattern + branch_pattern, line)
+            full_match = full_branch_pattern.search(line)
             if full_match:
                 full_branch = full_match.group()
-                branch_match = re.search(branch_pattern, full_branch)
+                branch_match = branch_pattern.search(full_branch)
                 if branch_match:
                     current_branch = branch_match.group()
                     if in_0QCQ and current_branch == '/B1':
@@ -10,6 +10,7 @@ from pathlib import Path
 import csv
 import tempfile
 import pandas as pd
+import numpy as np
 
 # Add parent directory to path to import the module
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -20,7 +21,14 @@ from weld_counter import (
     extract_branch_connections,
     extract_components_from_branches,
     lookup_and_merge_with_excel,
-    save_to_csv
+    read_excel,
+    load_welded_components,
+    save_to_csv,
+    parse_e3d_listing,
+    classify_component_pairs_numpy,
+    classify_component_pairs_loop,
+    count_component_relationships,
+    Relationship
 )
 
 
@@ -914,6 +922,86 @@ class TestLookupAndMergeWithExcel:
         assert result[0]['TYPE'] == ''
         assert result[0]['Welded'] == 'X'  # BWD on P2
     
+    def test_excel_reread_after_change(self, tmp_path):
+        """Test that the cached Excel data is refreshed when the file changes"""
+        components = [
+            {'Pipe': '0ABC12BR100', 'Branch': '/B1', 'Component_Type': 'FLANGE', 'SPRE': '/SPEC/FLANGE1'}
+        ]
+        
+        excel_file = tmp_path / "test_cache.xlsx"
+        pd.DataFrame({'SPRE': ['/SPEC/FLANGE1'], 'P1 CONN': ['FLG'], 'P2 CONN': ['FLG'], 'TYPE': ['FLANGE']}).to_excel(excel_file, index=False)
+        os.utime(excel_file, ns=(1_000_000_000, 1_000_000_000))
+        
+        assert read_excel(str(excel_file)) is read_excel(str(excel_file))
+        assert lookup_and_merge_with_excel(components, str(excel_file))[0]['Welded'] == ''
+        
+        pd.DataFrame({'SPRE': ['/SPEC/FLANGE1'], 'P1 CONN': ['BWD'], 'P2 CONN': ['FLG'], 'TYPE': ['FLANGE']}).to_excel(excel_file, index=False)
+        os.utime(excel_file, ns=(2_000_000_000, 2_000_000_000))
+        
+        assert lookup_and_merge_with_excel(components, str(excel_file))[0]['Welded'] == 'X'
+    
+    def test_welded_components_cached(self, tmp_path):
+        """Test that the welded component lookup is built once per Excel file version"""
+        excel_file = tmp_path / "test_welded.xlsx"
+        pd.DataFrame({'SPRE': ['/SPEC/ELBOW1'], 'P1 CONN': ['BWD'], 'P2 CONN': ['BWD'], 'TYPE': ['ELBO'],
+                      'PBOR': ['100mm'], 'PBOR1': ['0mm'], 'FORM': [None]}).to_excel(excel_file, index=False)
+        os.utime(excel_file, ns=(1_000_000_000, 1_000_000_000))
+        
+        welded_components = load_welded_components(excel_file)
+        assert welded_components['/SPEC/ELBOW1']['welded']
+        assert load_welded_components(str(excel_file)) is welded_components
+        
+        pd.DataFrame({'SPRE': ['/SPEC/ELBOW1'], 'P1 CONN': ['FLG'], 'P2 CONN': ['FLG'], 'TYPE': ['ELBO'],
+                      'PBOR': ['100mm'], 'PBOR1': ['0mm'], 'FORM': [None]}).to_excel(excel_file, index=False)
+        os.utime(excel_file, ns=(2_000_000_000, 2_000_000_000))
+        
+        assert not load_welded_components(excel_file)['/SPEC/ELBOW1']['welded']
+    
+    def test_excel_parquet_cache(self, tmp_path):
+        """Test that the sheet is kept as Parquet next to the Excel file and read back unchanged"""
+        pytest.importorskip('pyarrow')
+        from weld_counter import _read_excel_cached
+        
+        excel_file = tmp_path / "test_parquet.xlsx"
+        pd.DataFrame({
+            'SPRE': ['/SPEC/FLANGE1', '/SPEC/ELBOW1'],
+            'P1 CONN': ['BWD', pd.NA],
+            'PBOR': ['100mm', 50]
+        }).to_excel(excel_file, index=False)
+        
+        df_excel = read_excel(str(excel_file))
+        assert (tmp_path / "test_parquet.xlsx.parquet").exists()
+        assert list(df_excel['PBOR']) == ['100mm', '50']
+        
+        _read_excel_cached.cache_clear()
+        pd.testing.assert_frame_equal(read_excel(str(excel_file)), df_excel)
+    
+    def test_excel_parquet_cache_rebuilt_for_other_format(self, tmp_path, monkeypatch):
+        """Test that a Parquet copy without the current format marker is not reused"""
+        pytest.importorskip('pyarrow')
+        import weld_counter
+        
+        excel_file = tmp_path / "test_parquet_format.xlsx"
+        pd.DataFrame({'SPRE': ['/SPEC/FLANGE1'], 'PBOR': ['100mm']}).to_excel(excel_file, index=False)
+        parquet_file = tmp_path / "test_parquet_format.xlsx.parquet"
+        mtime = excel_file.stat().st_mtime_ns
+        
+        # Stale copy with the Excel modification time but written without the marker
+        pd.DataFrame({'SPRE': ['/SPEC/STALE']}).to_parquet(parquet_file, index=False)
+        os.utime(parquet_file, ns=(mtime, mtime))
+        weld_counter._read_excel_cached.cache_clear()
+        assert list(read_excel(str(excel_file))['SPRE']) == ['/SPEC/FLANGE1']
+        
+        # Copy written by an older format version
+        monkeypatch.setattr(weld_counter, 'EXCEL_CACHE_MARKER', b'0:SPRE')
+        weld_counter._read_excel_cached.cache_clear()
+        read_excel(str(excel_file))
+        monkeypatch.undo()
+        weld_counter._read_excel_cached.cache_clear()
+        assert not weld_counter._parquet_cache_is_current(parquet_file, mtime)
+        assert list(read_excel(str(excel_file))['SPRE']) == ['/SPEC/FLANGE1']
+        assert weld_counter._parquet_cache_is_current(parquet_file, mtime)
+    
     def test_real_data_weld_count(self):
         """Test with real data files"""
         real_txt = Path(__file__).parent.parent / "TBY" / "TBY-0AUX-P.txt"
@@ -1482,6 +1570,113 @@ END
         assert branches_with_tail_pipe > 0
 
 
+class TestParseE3DListing:
+    """Tests for parse_e3d_listing function"""
+    
+    def test_listing_shared_by_extractors(self, tmp_path):
+        """Test that extractors give the same results for a parsed listing as for the file path"""
+        test_file = tmp_path / "test_listing.txt"
+        test_file.write_text("""
+NEW PIPE /0ABC12BR100
+NEW BRANCH /0ABC12BR100/B1
+HPOS X 1000mm Y 2000mm Z 3000mm
+TPOS X 2000mm Y 2000mm Z 3000mm
+HCON BWD
+TCON BWD
+NEW FLANGE
+POS X 1100mm Y 2000mm Z 3000mm
+SPRE SPCOMPONENT /SPEC/FLANGE1
+END
+NEW ELBOW
+POS X 1900mm Y 2000mm Z 3000mm
+SPRE SPCOMPONENT /SPEC/ELBOW1
+END
+END
+""")
+        
+        listing = parse_e3d_listing(str(test_file))
+        
+        assert listing['file_path'] == str(test_file)
+        assert len(listing['lines']) == 16
+        assert extract_branch_positions(listing) == extract_branch_positions(str(test_file))
+        assert extract_branch_connections(listing) == extract_branch_connections(str(test_file))
+        assert extract_components_from_branches(listing) == extract_components_from_branches(str(test_file))
+        assert len(extract_components_from_branches(listing)) == 2
+    
+    def test_listing_events(self, tmp_path):
+        """Test that relevant lines are tokenized into events and other lines are skipped"""
+        test_file = tmp_path / "test_events.txt"
+        test_file.write_text("""
+NEW PIPE /0ABC12BR100
+BUIL false
+NEW BRANCH /0ABC12BR100/B1
+HPOS X 1000mm Y 2000mm Z 3000mm
+HCON BWD
+HSTU SPCOMPONENT /SPEC/TUBE1
+NEW FLANGE
+POS X 1100.5mm Y -2000mm Z 3000mm
+SPRE SPCOMPONENT /SPEC/FLANGE1
+TPOS X ABCmm Y 2000mm Z 3000mm
+END
+""")
+        
+        listing = parse_e3d_listing(str(test_file))
+        
+        assert listing['events'] == [
+            ('pipe', '0ABC12BR100'),
+            ('branch', '/B1'),
+            ('hpos', (1000.0, 2000.0, 3000.0)),
+            ('hcon', 'BWD'),
+            ('hstu', '/SPEC/TUBE1'),
+            ('new', 'FLANGE'),
+            ('pos', (1100.5, -2000.0, 3000.0)),
+            ('spre', '/SPEC/FLANGE1'),
+            ('tpos', None)
+        ]
+    
+    def test_nonexistent_file(self):
+        """Test with nonexistent file"""
+        with pytest.raises(FileNotFoundError):
+            parse_e3d_listing("nonexistent_file.txt")
+
+
+class TestClassifyComponentPairs:
+    """Tests for the component pair classification kernels"""
+    
+    def test_numpy_and_loop_versions_match(self):
+        """Test that the NumPy and the loop (numba) version give identical results"""
+        # ELBO-ELBO touching, ELBO-TEE near, TEE-CAP separated, CAP-REDU without length
+        positions = np.array([[0.0, 0.0, 0.0], [200.0, 0.0, 0.0], [200.0, 140.0, 0.0],
+                              [200.0, 140.0, 900.0], [200.0, 140.0, 950.0]])
+        lengths = np.array([100.0, 100.0, 150.0, 50.0, np.nan])
+        codes = np.array([1, 1, 0, 2, 0])
+        
+        distances_np, expected_np, relationships_np = classify_component_pairs_numpy(positions, lengths, codes)
+        distances_loop, expected_loop, relationships_loop = classify_component_pairs_loop(positions, lengths, codes)
+        
+        assert distances_np.tolist() == distances_loop.tolist()
+        assert expected_np[:3].tolist() == expected_loop[:3].tolist()
+        assert np.isnan(expected_np[3]) and np.isnan(expected_loop[3])
+        assert relationships_np.tolist() == relationships_loop.tolist() == [0, 1, 2, 2]
+        assert expected_np[:3].tolist() == [200.0, 100.0, 150.0]
+    
+    def test_count_component_relationships(self):
+        """Test relationship counts and the touching count without OLETs and FLANGE-FLANGE pairs"""
+        pairs = [
+            {'Relationship': Relationship.TOUCHING, 'Component_1_Type': 'ELBO', 'Component_2_Type': 'TEE'},
+            {'Relationship': Relationship.TOUCHING, 'Component_1_Type': 'FLANGE', 'Component_2_Type': 'FLANGE'},
+            {'Relationship': Relationship.TOUCHING, 'Component_1_Type': 'TEE', 'Component_2_Type': 'OLET'},
+            {'Relationship': Relationship.TOUCHING, 'Component_1_Type': 'FLANGE', 'Component_2_Type': 'ELBO'},
+            {'Relationship': Relationship.SEPARATED, 'Component_1_Type': 'ELBO', 'Component_2_Type': 'ELBO'}
+        ]
+        
+        relationship_counts, touching_count_filtered = count_component_relationships(pairs)
+        
+        assert relationship_counts.tolist() == [4, 0, 1]
+        assert touching_count_filtered == 2
+        assert count_component_relationships([])[1] == 0
+
+
 class TestEdgeCases:
     """Tests for edge cases and error conditions"""
     
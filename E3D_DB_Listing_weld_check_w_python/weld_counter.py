@@ -1,7 +1,151 @@
+import os
 import re
+import sys
 import csv
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from enum import IntEnum
+from functools import lru_cache
+from math import sqrt
+from operator import itemgetter
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from scipy.spatial import cKDTree
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # numba is optional, the component pair classification falls back to NumPy
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # pyarrow is optional, without it the Excel file is parsed on every run
+
+# Regular expressions for the E3D database listing lines (compiled once)
+KKS_PATTERN = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}')
+# Full branch reference (KKS + branch), the branch name like '/B1' is group 1
+FULL_BRANCH_PATTERN = re.compile(r'\d[A-Z]{3}\d{2}BR\d{3}(/B\d+)')
+HCON_PATTERN = re.compile(r'HCON\s+(\S+)')
+TCON_PATTERN = re.compile(r'TCON\s+(\S+)')
+HSTU_PATTERN = re.compile(r'HSTU SPCOMPONENT\s+(\S+)')
+SPRE_PATTERN = re.compile(r'SPRE SPCOMPONENT\s+(\S+)')
+HPOS_PATTERN = re.compile(r'HPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
+TPOS_PATTERN = re.compile(r'TPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
+POS_PATTERN = re.compile(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm')
+
+# Leading keyword of a listing line -> (event kind, pattern of its value)
+KEYWORD_EVENTS = {
+    'POS': ('pos', POS_PATTERN),
+    'HPOS': ('hpos', HPOS_PATTERN),
+    'TPOS': ('tpos', TPOS_PATTERN),
+    'HCON': ('hcon', HCON_PATTERN),
+    'TCON': ('tcon', TCON_PATTERN),
+    'HSTU': ('hstu', HSTU_PATTERN)
+}
+
+# Types of NEW lines inside a branch that are not components
+NON_COMPONENT_TYPES = frozenset({'BRANCH', 'PIPE', 'ZONE', 'SITE', 'STRUCTURE', 'SUBSTRUCTURE', 'CYLINDER', 'CTORUS'})
+# Same without attachments (only piping components: FLANGE, ELBOW, TEE, REDUCER, VALVE, etc.)
+NON_PIPING_COMPONENT_TYPES = NON_COMPONENT_TYPES | {'ATTACHMENT'}
+
+def iter_listing_events(lines):
+    """
+    Classify the lines of an E3D database listing into events shared by all extractors.
+    
+    Every line is tokenized only once. Lines containing NEW PIPE or NEW BRANCH are matched first,
+    all other lines by their leading keyword. Lines that none of the extractors use are skipped.
+    The value is None if the line does not match the expected pattern.
+    
+    Yields:
+        (kind, value) tuples:
+        - ('pipe', kks), ('branch', branch name like '/B1')
+        - ('hcon', value), ('tcon', value), ('hstu', value), ('spre', value)
+        - ('hpos', (x, y, z)), ('tpos', (x, y, z)), ('pos', (x, y, z))
+        - ('new', component type of a NEW line other than PIPE/BRANCH)
+    """
+    # Bind the hot lookups to local names once (avoids global and attribute lookups per line)
+    kks_search = KKS_PATTERN.search
+    full_branch_search = FULL_BRANCH_PATTERN.search
+    spre_search = SPRE_PATTERN.search
+    keyword_event_get = KEYWORD_EVENTS.get
+    # Pipe/branch names, component types, connection types and SPREs repeat throughout the listing:
+    # interned, all records share one string object per value
+    intern = sys.intern
+    
+    for line in lines:
+        # Cheap substring screen first: most lines contain none of the keywords
+        # ('POS ' also covers HPOS/TPOS, 'CON ' covers HCON/TCON).
+        # One combined alternation regex searched on every line is ~3x slower than this screen
+        # NEW PIPE and NEW BRANCH lines always contain 'NEW ', so they are only looked for there
+        if 'NEW ' in line:
+            if 'NEW PIPE' in line:
+                match = kks_search(line)
+                yield ('pipe', intern(match.group()) if match else None)
+                continue
+            
+            if 'NEW BRANCH' in line:
+                full_match = full_branch_search(line)
+                yield ('branch', intern(full_match.group(1)) if full_match else None)
+                continue
+        
+        elif not ('POS ' in line or 'CON ' in line or 'SPRE ' in line or 'HSTU ' in line):
+            continue
+        
+        # Dispatch on the leading keyword of the line
+        stripped = line.strip()
+        keyword, separator, _ = stripped.partition(' ')
+        keyword_event = keyword_event_get(keyword) if separator else None
+        
+        if keyword_event is not None:
+            kind, pattern = keyword_event
+            # Anchored match on the stripped line first, it fails fast; the leftmost
+            # search hit starts there too whenever it matches.
+            # For the POS lines this is as fast as split() + float(part[:-2]) and keeps the validation
+            match = pattern.match(stripped) or pattern.search(line)
+            if match is None:
+                yield (kind, None)
+            elif pattern.groups == 3:
+                yield (kind, (float(match.group(1)), float(match.group(2)), float(match.group(3))))
+            else:
+                yield (kind, intern(match.group(1)))
+        
+        elif keyword == 'NEW' and separator:
+            parts = stripped.split(None, 2)  # only the component type is needed
+            yield ('new', intern(parts[1]) if len(parts) >= 2 else None)
+        
+        elif 'SPRE SPCOMPONENT' in line:
+            spre_match = spre_search(line)
+            yield ('spre', intern(spre_match.group(1)) if spre_match else None)
+
+def parse_e3d_listing(file_path):
+    """
+    Read and tokenize an E3D database listing file once so that all extractors can share it.
+    
+    Returns a dictionary with the file path, the raw lines and the events from
+    iter_listing_events(). It can be passed to the extract_* functions instead of the file path.
+    """
+    # Plain readlines() + the substring screen in iter_listing_events() is faster than pre-filtering
+    # the whole file with one regex scan (finditer over the text or an mmap): ~20 ms vs ~30-45 ms per TBY listing
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    
+    return {
+        'file_path': file_path,
+        'lines': lines,
+        'events': list(iter_listing_events(lines))
+    }
+
+def get_listing_events(listing):
+    """
+    Return the events of a listing parsed by parse_e3d_listing() or parse them from a file path.
+    """
+    if isinstance(listing, dict):
+        return listing['events']
+    return parse_e3d_listing(listing)['events']
 
 def extract_branch_positions(file_path):
     """
@@ -9,79 +153,57 @@ def extract_branch_positions(file_path):
     
     Returns list of branches with their head and tail positions.
     """
-    kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-    branch_pattern = r'/B\d+'
-    
     branches = []
     current_pipe = None
     current_branch = None
     current_branch_info = {}
     in_branch = False
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Check if line contains "NEW PIPE"
-            if 'NEW PIPE' in line:
-                match = re.search(kks_pattern, line)
-                if match:
-                    current_pipe = match.group()
-                    current_branch = None
-                    in_branch = False
+    for kind, value in get_listing_events(file_path):
+        # NEW PIPE line
+        if kind == 'pipe':
+            if value:
+                current_pipe = value
+                current_branch = None
+                in_branch = False
+        
+        # NEW BRANCH line
+        elif kind == 'branch' and current_pipe:
+            # Save previous branch if exists
+            # (a copy is only needed when the dict stays current, i.e. the branch name did not match)
+            if current_branch_info and current_branch_info.get('Pipe'):
+                branches.append(current_branch_info if value else current_branch_info.copy())
             
-            # Check if line contains "NEW BRANCH"
-            elif 'NEW BRANCH' in line and current_pipe:
-                # Save previous branch if exists
-                if current_branch_info and current_branch_info.get('Pipe'):
-                    branches.append(current_branch_info.copy())
-                
-                full_match = re.search(kks_pattern + branch_pattern, line)
-                if full_match:
-                    full_branch = full_match.group()
-                    branch_match = re.search(branch_pattern, full_branch)
-                    if branch_match:
-                        current_branch = branch_match.group()
-                        current_branch_info = {
-                            'Pipe': current_pipe,
-                            'Branch': current_branch,
-                            'Full_Branch_ID': current_pipe + current_branch,
-                            'HCON': '',
-                            'TCON': '',
-                            'HPOS_X': None,
-                            'HPOS_Y': None,
-                            'HPOS_Z': None,
-                            'TPOS_X': None,
-                            'TPOS_Y': None,
-                            'TPOS_Z': None
-                        }
-                        in_branch = True
+            if value:
+                current_branch = value
+                current_branch_info = {
+                    'Pipe': current_pipe,
+                    'Branch': current_branch,
+                    'Full_Branch_ID': current_pipe + current_branch,
+                    'HCON': '',
+                    'TCON': '',
+                    'HPOS_X': None,
+                    'HPOS_Y': None,
+                    'HPOS_Z': None,
+                    'TPOS_X': None,
+                    'TPOS_Y': None,
+                    'TPOS_Z': None
+                }
+                in_branch = True
+        
+        # Extract HPOS, TPOS, HCON, TCON
+        elif in_branch and current_branch_info and value is not None:
+            if kind == 'hcon':
+                current_branch_info['HCON'] = value
             
-            # Extract HPOS, TPOS, HCON, TCON
-            elif in_branch and current_branch_info:
-                if line.strip().startswith('HCON '):
-                    hcon_match = re.search(r'HCON\s+(\S+)', line)
-                    if hcon_match:
-                        current_branch_info['HCON'] = hcon_match.group(1)
-                
-                elif line.strip().startswith('TCON '):
-                    tcon_match = re.search(r'TCON\s+(\S+)', line)
-                    if tcon_match:
-                        current_branch_info['TCON'] = tcon_match.group(1)
-                
-                elif line.strip().startswith('HPOS '):
-                    # Extract coordinates from HPOS line
-                    hpos_match = re.search(r'HPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if hpos_match:
-                        current_branch_info['HPOS_X'] = float(hpos_match.group(1))
-                        current_branch_info['HPOS_Y'] = float(hpos_match.group(2))
-                        current_branch_info['HPOS_Z'] = float(hpos_match.group(3))
-                
-                elif line.strip().startswith('TPOS '):
-                    # Extract coordinates from TPOS line
-                    tpos_match = re.search(r'TPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if tpos_match:
-                        current_branch_info['TPOS_X'] = float(tpos_match.group(1))
-                        current_branch_info['TPOS_Y'] = float(tpos_match.group(2))
-                        current_branch_info['TPOS_Z'] = float(tpos_match.group(3))
+            elif kind == 'tcon':
+                current_branch_info['TCON'] = value
+            
+            elif kind == 'hpos':
+                current_branch_info['HPOS_X'], current_branch_info['HPOS_Y'], current_branch_info['HPOS_Z'] = value
+            
+            elif kind == 'tpos':
+                current_branch_info['TPOS_X'], current_branch_info['TPOS_Y'], current_branch_info['TPOS_Z'] = value
     
     # Don't forget the last branch
     if current_branch_info and current_branch_info.get('Pipe'):
@@ -89,6 +211,25 @@ def extract_branch_positions(file_path):
     
     return branches
 
+# Match types of find_connected_branches() indexed by match code (one shared string object each)
+MATCH_TYPES = np.array(['XY_tight_Z_loose', 'XZ_tight_Y_loose', 'YZ_tight_X_loose'], dtype=object)
+
+def branch_position_arrays(branches):
+    """
+    Build a column (structure-of-arrays) view of branch positions for vectorized processing.
+    
+    Returns dict with contiguous float64 arrays 'hpos' and 'tpos' of shape (N, 3) (NaN where a
+    position is missing), 'ids' (Full_Branch_ID, object array) and boolean 'hcon_bwd'/'tcon_bwd'.
+    The branch dictionaries stay the form returned to callers.
+    """
+    return {
+        'hpos': np.array([(b['HPOS_X'], b['HPOS_Y'], b['HPOS_Z']) for b in branches], dtype=np.float64).reshape(-1, 3),
+        'tpos': np.array([(b['TPOS_X'], b['TPOS_Y'], b['TPOS_Z']) for b in branches], dtype=np.float64).reshape(-1, 3),
+        'ids': np.array([b['Full_Branch_ID'] for b in branches], dtype=object),
+        'hcon_bwd': np.array([b.get('HCON', '') == 'BWD' for b in branches], dtype=bool),
+        'tcon_bwd': np.array([b.get('TCON', '') == 'BWD' for b in branches], dtype=bool)
+    }
+
 def find_connected_branches(branches, tolerance_tight=5.0, tolerance_loose=150.0):
     """
     Find branches that are connected based on axis-combination matching.
@@ -108,106 +249,143 @@ def find_connected_branches(branches, tolerance_tight=5.0, tolerance_loose=150.0
         List of connection dictionaries with paired branches side by side
     """
     connections = []
-    processed_pairs = set()
+    columns = branch_position_arrays(branches)
+    
+    # Only branches with a tail can start a connection, only branches with a head can end one
+    tail_idx = np.flatnonzero(~np.isnan(columns['tpos'][:, 0]))
+    head_idx = np.flatnonzero(~np.isnan(columns['hpos'][:, 0]))
+    if len(tail_idx) == 0 or len(head_idx) == 0:
+        return connections
+    
+    tails = columns['tpos'][tail_idx]
+    heads = columns['hpos'][head_idx]
+    
+    # Candidate search with KD-trees over tails and heads: every axis-combination match lies
+    # inside a Chebyshev (p=inf) ball of the larger tolerance around the tail.
+    # The tree-to-tree search returns all candidate (tail, head) pairs as flat arrays.
+    # Sliding-midpoint trees (balanced_tree=False) build faster than median splits for one-off searches.
+    tail_tree = cKDTree(tails, balanced_tree=False)
+    head_tree = cKDTree(heads, balanced_tree=False)
+    candidates = tail_tree.sparse_distance_matrix(head_tree, max(tolerance_tight, tolerance_loose),
+                                                  p=np.inf, output_type='ndarray')
+    if len(candidates) == 0:
+        return connections
+    
+    tail_pos = candidates['i'].astype(np.intp)
+    head_pos = candidates['j'].astype(np.intp)
+    
+    # Calculate individual axis offsets for all candidate pairs at once
+    offsets = np.abs(tails[tail_pos] - heads[head_pos])
+    offset_x, offset_y, offset_z = offsets[:, 0], offsets[:, 1], offsets[:, 2]
+    
+    # Check all three axis combinations (first matching combination wins)
+    if tolerance_tight <= tolerance_loose:
+        # Two tight axes and one loose axis <=> the two smallest offsets are tight and the largest is loose.
+        # At most one axis is beyond the tight tolerance and that is the loose one (XY when all are tight)
+        sorted_offsets = np.sort(offsets, axis=1)
+        matched = (sorted_offsets[:, 1] <= tolerance_tight) & (sorted_offsets[:, 2] <= tolerance_loose)
+        match_code = np.where(matched, np.where(offset_y > tolerance_tight, 1, np.where(offset_x > tolerance_tight, 2, 0)), -1)
+    else:
+        m_xy = (offset_x <= tolerance_tight) & (offset_y <= tolerance_tight) & (offset_z <= tolerance_loose)
+        m_xz = (offset_x <= tolerance_tight) & (offset_z <= tolerance_tight) & (offset_y <= tolerance_loose)
+        m_yz = (offset_y <= tolerance_tight) & (offset_z <= tolerance_tight) & (offset_x <= tolerance_loose)
+        match_code = np.select([m_xy, m_xz, m_yz], [0, 1, 2], default=-1)
+    
+    i_all = tail_idx[tail_pos]
+    j_all = head_idx[head_pos]
+    
+    # Only keep connections where at least one of the connection ends is welded (BWD)
+    keep = (match_code >= 0) & (i_all != j_all) & (columns['tcon_bwd'][i_all] | columns['hcon_bwd'][j_all])
+    
+    # Visit surviving pairs in the same (branch1, branch2) order as a full scan would
+    kept = np.flatnonzero(keep)
+    kept = kept[np.lexsort((j_all[kept], i_all[kept]))]
+    
+    # Avoid duplicates (order-independent branch ID pairs): keep the first occurrence of each pair
+    _, id_codes = np.unique(columns['ids'], return_inverse=True)
+    id_codes = id_codes.reshape(-1)
+    code_a = id_codes[i_all[kept]]
+    code_b = id_codes[j_all[kept]]
+    pair_keys = np.minimum(code_a, code_b) * len(branches) + np.maximum(code_a, code_b)
+    _, first_seen = np.unique(pair_keys, return_index=True)
+    kept = kept[np.sort(first_seen)]
+    
+    # 3D distance and accuracy offsets of the surviving pairs:
+    # maximum offset among the two tight axes and the offset of the loose axis
+    kept_offsets = offsets[kept]
+    kept_codes = match_code[kept]
+    offset_x, offset_y, offset_z = kept_offsets[:, 0], kept_offsets[:, 1], kept_offsets[:, 2]
+    distances = np.sqrt(offset_x * offset_x + offset_y * offset_y + offset_z * offset_z)
+    max_tight_offsets = np.select([kept_codes == 0, kept_codes == 1],
+                                  [np.maximum(offset_x, offset_y), np.maximum(offset_x, offset_z)],
+                                  default=np.maximum(offset_y, offset_z))
+    loose_offsets = kept_offsets[np.arange(len(kept)), np.array([2, 1, 0])[kept_codes]]
+    
+    # Accuracy percentage: how close are the tight axes to perfect (0mm)
+    # 100% = perfect (0mm), decreases as offset approaches tolerance_tight (5mm); never below 0
+    accuracy_pct = 100 * (1 - max_tight_offsets / tolerance_tight)
+    accuracy_column = np.round(accuracy_pct, 1).astype(object)
+    accuracy_column[accuracy_pct <= 0] = 0
+    
+    # Assemble the connections column by column (paired branches side by side)
+    i_kept = i_all[kept]
+    j_kept = j_all[kept]
+    branches_a = [branches[i] for i in i_kept.tolist()]
+    branches_b = [branches[j] for j in j_kept.tolist()]
+    connection_columns = {
+        'Branch_A': columns['ids'][i_kept],
+        'Branch_A_TCON': [b.get('TCON', '') for b in branches_a],
+        'Branch_B': columns['ids'][j_kept],
+        'Branch_B_HCON': [b.get('HCON', '') for b in branches_b],
+        'Branch_A_Pipe': [b['Pipe'] for b in branches_a],
+        'Branch_A_Branch': [b['Branch'] for b in branches_a],
+        'Branch_B_Pipe': [b['Pipe'] for b in branches_b],
+        'Branch_B_Branch': [b['Branch'] for b in branches_b],
+        'Connection_X': columns['tpos'][i_kept, 0],
+        'Connection_Y': columns['tpos'][i_kept, 1],
+        'Connection_Z': columns['tpos'][i_kept, 2],
+        'Distance_mm': np.round(distances, 3),
+        'Offset_X_mm': np.round(offset_x, 3),
+        'Offset_Y_mm': np.round(offset_y, 3),
+        'Offset_Z_mm': np.round(offset_z, 3),
+        'Max_Tight_Offset_mm': np.round(max_tight_offsets, 3),
+        'Loose_Offset_mm': np.round(loose_offsets, 3),
+        'Accuracy_Percent': accuracy_column,
+        'Match_Type': MATCH_TYPES[kept_codes]
+    }
     
-    for i, branch1 in enumerate(branches):
-        # Skip if branch doesn't have tail position
-        if branch1['TPOS_X'] is None:
-            continue
-        
-        tail_x = branch1['TPOS_X']
-        tail_y = branch1['TPOS_Y']
-        tail_z = branch1['TPOS_Z']
-        
-        for j, branch2 in enumerate(branches):
-            # Skip same branch or if branch doesn't have head position
-            if i == j or branch2['HPOS_X'] is None:
-                continue
-            
-            head_x = branch2['HPOS_X']
-            head_y = branch2['HPOS_Y']
-            head_z = branch2['HPOS_Z']
-            
-            # Calculate individual axis offsets
-            offset_x = abs(tail_x - head_x)
-            offset_y = abs(tail_y - head_y)
-            offset_z = abs(tail_z - head_z)
-            
-            # Calculate 3D distance
-            distance = ((tail_x - head_x)**2 + 
-                       (tail_y - head_y)**2 + 
-                       (tail_z - head_z)**2)**0.5
-            
-            # Check all three axis combinations
-            match_type = None
-            
-            # Combination 1: X and Y tight, Z loose
-            if offset_x <= tolerance_tight and offset_y <= tolerance_tight and offset_z <= tolerance_loose:
-                match_type = 'XY_tight_Z_loose'
-            
-            # Combination 2: X and Z tight, Y loose
-            elif offset_x <= tolerance_tight and offset_z <= tolerance_tight and offset_y <= tolerance_loose:
-                match_type = 'XZ_tight_Y_loose'
-            
-            # Combination 3: Y and Z tight, X loose
-            elif offset_y <= tolerance_tight and offset_z <= tolerance_tight and offset_x <= tolerance_loose:
-                match_type = 'YZ_tight_X_loose'
-            
-            # If any match found, record connection
-            if match_type:
-                # Check if at least one of the connection ends is welded (BWD)
-                tcon_bwd = branch1.get('TCON', '') == 'BWD'
-                hcon_bwd = branch2.get('HCON', '') == 'BWD'
-                
-                # Skip this connection if neither end is welded
-                if not (tcon_bwd or hcon_bwd):
-                    continue
-                
-                # Create a pair key to avoid duplicates (order-independent)
-                pair_key = tuple(sorted([branch1['Full_Branch_ID'], branch2['Full_Branch_ID']]))
-                
-                # Only add if this pair hasn't been processed
-                if pair_key not in processed_pairs:
-                    processed_pairs.add(pair_key)
-                    
-                    # Calculate accuracy metric: maximum offset among the two tight axes
-                    if match_type == 'XY_tight_Z_loose':
-                        max_tight_offset = max(offset_x, offset_y)
-                        loose_offset = offset_z
-                    elif match_type == 'XZ_tight_Y_loose':
-                        max_tight_offset = max(offset_x, offset_z)
-                        loose_offset = offset_y
-                    else:  # YZ_tight_X_loose
-                        max_tight_offset = max(offset_y, offset_z)
-                        loose_offset = offset_x
-                    
-                    # Accuracy percentage: how close are the tight axes to perfect (0mm)
-                    # 100% = perfect (0mm), decreases as offset approaches tolerance_tight (5mm)
-                    accuracy_pct = max(0, 100 * (1 - max_tight_offset / tolerance_tight))
-                    
-                    connections.append({
-                        'Branch_A': branch1['Full_Branch_ID'],
-                        'Branch_A_TCON': branch1.get('TCON', ''),
-                        'Branch_B': branch2['Full_Branch_ID'],
-                        'Branch_B_HCON': branch2.get('HCON', ''),
-                        'Branch_A_Pipe': branch1['Pipe'],
-                        'Branch_A_Branch': branch1['Branch'],
-                        'Branch_B_Pipe': branch2['Pipe'],
-                        'Branch_B_Branch': branch2['Branch'],
-                        'Connection_X': tail_x,
-                        'Connection_Y': tail_y,
-                        'Connection_Z': tail_z,
-                        'Distance_mm': round(distance, 3),
-                        'Offset_X_mm': round(offset_x, 3),
-                        'Offset_Y_mm': round(offset_y, 3),
-                        'Offset_Z_mm': round(offset_z, 3),
-                        'Max_Tight_Offset_mm': round(max_tight_offset, 3),
-                        'Loose_Offset_mm': round(loose_offset, 3),
-                        'Accuracy_Percent': round(accuracy_pct, 1),
-                        'Match_Type': match_type
-                    })
+    # One record per connection from the columns (NumPy values converted to Python scalars)
+    column_values = [values.tolist() if isinstance(values, np.ndarray) else values
+                     for values in connection_columns.values()]
+    return [dict(zip(connection_columns, row)) for row in zip(*column_values)]
+
+def point_distance_sq(p, q):
+    """
+    Squared 3D distance between two (x, y, z) points (for comparisons against squared thresholds).
+    """
+    dx = p[0] - q[0]
+    dy = p[1] - q[1]
+    dz = p[2] - q[2]
+    return dx * dx + dy * dy + dz * dz
+
+def point_distance(p, q):
+    """
+    3D distance between two (x, y, z) points.
+    """
+    return sqrt(point_distance_sq(p, q))
+
+def set_pipe_lengths(branch_info, first_component_pos, last_component_pos):
+    """
+    Set the straight pipe lengths of a branch: from the head (HPOS) to the first component and
+    from the last component to the tail (TPOS). Lengths stay unchanged when a position is missing.
+    """
+    if branch_info['HPOS_X'] is not None and first_component_pos is not None:
+        hpos = (branch_info['HPOS_X'], branch_info['HPOS_Y'], branch_info['HPOS_Z'])
+        branch_info['Head_Pipe_Length_mm'] = round(point_distance(hpos, first_component_pos), 2)
     
-    return connections
+    if branch_info['TPOS_X'] is not None and last_component_pos is not None:
+        tpos = (branch_info['TPOS_X'], branch_info['TPOS_Y'], branch_info['TPOS_Z'])
+        branch_info['Tail_Pipe_Length_mm'] = round(point_distance(tpos, last_component_pos), 2)
 
 def extract_branch_connections(file_path):
     """
@@ -215,9 +393,6 @@ def extract_branch_connections(file_path):
     
     Returns list of branches with their HCON, TCON, first/last components, and pipe lengths.
     """
-    kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-    branch_pattern = r'/B\d+'
-    
     branches = []
     current_pipe = None
     current_branch = None
@@ -228,168 +403,105 @@ def extract_branch_connections(file_path):
     last_component_pos = None
     current_component_is_valid = False  # Track if current NEW component is valid
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Check if line contains "NEW PIPE"
-            if 'NEW PIPE' in line:
-                # Save previous branch before resetting (if exists)
-                if current_branch_info and current_branch_info.get('Pipe'):
-                    # Calculate pipe lengths before saving branch
-                    if current_branch_info['HPOS_X'] is not None and first_component_pos is not None:
-                        hpos = (current_branch_info['HPOS_X'], current_branch_info['HPOS_Y'], current_branch_info['HPOS_Z'])
-                        head_pipe_length = ((hpos[0] - first_component_pos[0])**2 + 
-                                           (hpos[1] - first_component_pos[1])**2 + 
-                                           (hpos[2] - first_component_pos[2])**2)**0.5
-                        current_branch_info['Head_Pipe_Length_mm'] = round(head_pipe_length, 2)
-                    
-                    if current_branch_info['TPOS_X'] is not None and last_component_pos is not None:
-                        tpos = (current_branch_info['TPOS_X'], current_branch_info['TPOS_Y'], current_branch_info['TPOS_Z'])
-                        tail_pipe_length = ((tpos[0] - last_component_pos[0])**2 + 
-                                           (tpos[1] - last_component_pos[1])**2 + 
-                                           (tpos[2] - last_component_pos[2])**2)**0.5
-                        current_branch_info['Tail_Pipe_Length_mm'] = round(tail_pipe_length, 2)
-                    
-                    branches.append(current_branch_info.copy())
-                    current_branch_info = {}  # Reset to prevent duplicate saves
+    for kind, value in get_listing_events(file_path):
+        # NEW PIPE line
+        if kind == 'pipe':
+            # Save previous branch before resetting (if exists)
+            if current_branch_info and current_branch_info.get('Pipe'):
+                # Calculate pipe lengths before saving the branch
+                set_pipe_lengths(current_branch_info, first_component_pos, last_component_pos)
                 
-                match = re.search(kks_pattern, line)
-                if match:
-                    current_pipe = match.group()
-                    current_branch = None
-                    in_branch = False
-                    branch_depth = 0
-                    first_component_pos = None
-                    last_component_pos = None
-                    current_component_is_valid = False
+                branches.append(current_branch_info)
+                current_branch_info = {}  # Reset to prevent duplicate saves
             
-            # Check if line contains "NEW BRANCH"
-            elif 'NEW BRANCH' in line and current_pipe:
-                # Save previous branch if exists (with pipe length calculation)
-                if current_branch_info and current_branch_info.get('Pipe'):
-                    # Calculate pipe lengths before saving branch using current position variables
-                    if current_branch_info['HPOS_X'] is not None and first_component_pos is not None:
-                        hpos = (current_branch_info['HPOS_X'], current_branch_info['HPOS_Y'], current_branch_info['HPOS_Z'])
-                        head_pipe_length = ((hpos[0] - first_component_pos[0])**2 + 
-                                           (hpos[1] - first_component_pos[1])**2 + 
-                                           (hpos[2] - first_component_pos[2])**2)**0.5
-                        current_branch_info['Head_Pipe_Length_mm'] = round(head_pipe_length, 2)
-                    
-                    if current_branch_info['TPOS_X'] is not None and last_component_pos is not None:
-                        tpos = (current_branch_info['TPOS_X'], current_branch_info['TPOS_Y'], current_branch_info['TPOS_Z'])
-                        tail_pipe_length = ((tpos[0] - last_component_pos[0])**2 + 
-                                           (tpos[1] - last_component_pos[1])**2 + 
-                                           (tpos[2] - last_component_pos[2])**2)**0.5
-                        current_branch_info['Tail_Pipe_Length_mm'] = round(tail_pipe_length, 2)
-                    
-                    branches.append(current_branch_info.copy())
-                
-                # Now reset for the new branch
+            if value:
+                current_pipe = value
+                current_branch = None
+                in_branch = False
+                branch_depth = 0
                 first_component_pos = None
                 last_component_pos = None
                 current_component_is_valid = False
+        
+        # NEW BRANCH line
+        elif kind == 'branch' and current_pipe:
+            # Save previous branch if exists (with pipe length calculation)
+            if current_branch_info and current_branch_info.get('Pipe'):
+                # Calculate pipe lengths before saving the branch
+                set_pipe_lengths(current_branch_info, first_component_pos, last_component_pos)
                 
-                full_match = re.search(kks_pattern + branch_pattern, line)
-                if full_match:
-                    full_branch = full_match.group()
-                    branch_match = re.search(branch_pattern, full_branch)
-                    if branch_match:
-                        current_branch = branch_match.group()
-                        current_branch_info = {
-                            'Pipe': current_pipe,
-                            'Branch': current_branch,
-                            'HCON': '',
-                            'TCON': '',
-                            'HSTU': '',
-                            'First_Component': '',
-                            'Last_Component': '',
-                            'HPOS_X': None,
-                            'HPOS_Y': None,
-                            'HPOS_Z': None,
-                            'TPOS_X': None,
-                            'TPOS_Y': None,
-                            'TPOS_Z': None,
-                            'Head_Pipe_Length_mm': 0,
-                            'Tail_Pipe_Length_mm': 0
-                        }
-                        in_branch = True
-                        branch_depth = 0
+                # A copy is only needed when the dict stays current (the branch name did not match)
+                branches.append(current_branch_info if value else current_branch_info.copy())
             
-            # Extract HCON, TCON, HSTU, HPOS, TPOS when inside a branch
-            elif in_branch and current_branch_info:
-                if line.strip().startswith('HPOS '):
-                    hpos_match = re.search(r'HPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if hpos_match:
-                        current_branch_info['HPOS_X'] = float(hpos_match.group(1))
-                        current_branch_info['HPOS_Y'] = float(hpos_match.group(2))
-                        current_branch_info['HPOS_Z'] = float(hpos_match.group(3))
-                
-                elif line.strip().startswith('TPOS '):
-                    tpos_match = re.search(r'TPOS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if tpos_match:
-                        current_branch_info['TPOS_X'] = float(tpos_match.group(1))
-                        current_branch_info['TPOS_Y'] = float(tpos_match.group(2))
-                        current_branch_info['TPOS_Z'] = float(tpos_match.group(3))
-                
-                elif line.strip().startswith('HCON '):
-                    hcon_match = re.search(r'HCON\s+(\S+)', line)
-                    if hcon_match:
-                        current_branch_info['HCON'] = hcon_match.group(1)
-                
-                elif line.strip().startswith('TCON '):
-                    tcon_match = re.search(r'TCON\s+(\S+)', line)
-                    if tcon_match:
-                        current_branch_info['TCON'] = tcon_match.group(1)
-                
-                elif line.strip().startswith('HSTU SPCOMPONENT'):
-                    hstu_match = re.search(r'HSTU SPCOMPONENT\s+(\S+)', line)
-                    if hstu_match:
-                        current_branch_info['HSTU'] = hstu_match.group(1)
-                
-                # Detect first component in branch (first NEW component after branch definition)
-                elif line.strip().startswith('NEW '):
-                    parts = line.strip().split()
-                    if len(parts) >= 2:
-                        component_type = parts[1]
-                        if component_type not in ['BRANCH', 'PIPE', 'ZONE', 'SITE', 'STRUCTURE', 'SUBSTRUCTURE', 'CYLINDER', 'CTORUS', 'ATTACHMENT']:
-                            current_component_is_valid = True
-                            if not current_branch_info['First_Component']:
-                                current_branch_info['First_Component'] = component_type
-                            # Always update last component
-                            current_branch_info['Last_Component'] = component_type
-                        else:
-                            current_component_is_valid = False
+            # Now reset for the new branch
+            first_component_pos = None
+            last_component_pos = None
+            current_component_is_valid = False
+            
+            if value:
+                current_branch = value
+                current_branch_info = {
+                    'Pipe': current_pipe,
+                    'Branch': current_branch,
+                    'HCON': '',
+                    'TCON': '',
+                    'HSTU': '',
+                    'First_Component': '',
+                    'Last_Component': '',
+                    'HPOS_X': None,
+                    'HPOS_Y': None,
+                    'HPOS_Z': None,
+                    'TPOS_X': None,
+                    'TPOS_Y': None,
+                    'TPOS_Z': None,
+                    'Head_Pipe_Length_mm': 0,
+                    'Tail_Pipe_Length_mm': 0
+                }
+                in_branch = True
+                branch_depth = 0
+        
+        # Extract HCON, TCON, HSTU, HPOS, TPOS when inside a branch
+        elif in_branch and current_branch_info and value is not None:
+            if kind == 'hpos':
+                current_branch_info['HPOS_X'], current_branch_info['HPOS_Y'], current_branch_info['HPOS_Z'] = value
+            
+            elif kind == 'tpos':
+                current_branch_info['TPOS_X'], current_branch_info['TPOS_Y'], current_branch_info['TPOS_Z'] = value
+            
+            elif kind == 'hcon':
+                current_branch_info['HCON'] = value
+            
+            elif kind == 'tcon':
+                current_branch_info['TCON'] = value
+            
+            elif kind == 'hstu':
+                current_branch_info['HSTU'] = value
+            
+            # Detect first component in branch (first NEW component after branch definition)
+            elif kind == 'new':
+                component_type = value
+                if component_type not in NON_PIPING_COMPONENT_TYPES:
+                    current_component_is_valid = True
+                    if not current_branch_info['First_Component']:
+                        current_branch_info['First_Component'] = component_type
+                    # Always update last component
+                    current_branch_info['Last_Component'] = component_type
+                else:
+                    current_component_is_valid = False
+            
+            # Extract component position (POS line) - only for valid components
+            elif kind == 'pos' and current_component_is_valid:
+                # Track first component position
+                if first_component_pos is None and current_branch_info['First_Component']:
+                    first_component_pos = value
                 
-                # Extract component position (POS line) - only for valid components
-                elif line.strip().startswith('POS ') and current_component_is_valid:
-                    pos_match = re.search(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if pos_match:
-                        comp_x = float(pos_match.group(1))
-                        comp_y = float(pos_match.group(2))
-                        comp_z = float(pos_match.group(3))
-                        
-                        # Track first component position
-                        if first_component_pos is None and current_branch_info['First_Component']:
-                            first_component_pos = (comp_x, comp_y, comp_z)
-                        
-                        # Always update last component position for valid components
-                        last_component_pos = (comp_x, comp_y, comp_z)
+                # Always update last component position for valid components
+                last_component_pos = value
     
     # Don't forget the last branch (with pipe length calculation)
     if current_branch_info and current_branch_info.get('Pipe'):
-        # Calculate pipe lengths before saving last branch
-        if current_branch_info['HPOS_X'] is not None and first_component_pos is not None:
-            hpos = (current_branch_info['HPOS_X'], current_branch_info['HPOS_Y'], current_branch_info['HPOS_Z'])
-            head_pipe_length = ((hpos[0] - first_component_pos[0])**2 + 
-                               (hpos[1] - first_component_pos[1])**2 + 
-                               (hpos[2] - first_component_pos[2])**2)**0.5
-            current_branch_info['Head_Pipe_Length_mm'] = round(head_pipe_length, 2)
-        
-        if current_branch_info['TPOS_X'] is not None and last_component_pos is not None:
-            tpos = (current_branch_info['TPOS_X'], current_branch_info['TPOS_Y'], current_branch_info['TPOS_Z'])
-            tail_pipe_length = ((tpos[0] - last_component_pos[0])**2 + 
-                               (tpos[1] - last_component_pos[1])**2 + 
-                               (tpos[2] - last_component_pos[2])**2)**0.5
-            current_branch_info['Tail_Pipe_Length_mm'] = round(tail_pipe_length, 2)
+        # Calculate pipe lengths before saving the branch
+        set_pipe_lengths(current_branch_info, first_component_pos, last_component_pos)
         
         branches.append(current_branch_info)
     
@@ -402,59 +514,107 @@ def extract_components_from_branches(file_path):
     Components: FLANGE, ELBOW, TEE, REDUCER, VALVE, ATTACHMENT, etc.
     Each component has a SPRE SPCOMPONENT property.
     """
-    kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-    branch_pattern = r'/B\d+'
-    
     components = []
     current_pipe = None
     current_branch = None
     current_component_type = None
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Check if line contains "NEW PIPE"
-            if 'NEW PIPE' in line:
-                match = re.search(kks_pattern, line)
-                if match:
-                    current_pipe = match.group()
-                    current_branch = None
-                    current_component_type = None
-            
-            # Check if line contains "NEW BRANCH"
-            elif 'NEW BRANCH' in line and current_pipe:
-                full_match = re.search(kks_pattern + branch_pattern, line)
-                if full_match:
-                    full_branch = full_match.group()
-                    branch_match = re.search(branch_pattern, full_branch)
-                    if branch_match:
-                        current_branch = branch_match.group()
-                        current_component_type = None
-            
-            # Check if line starts with "NEW " followed by a component type
-            elif line.strip().startswith('NEW ') and current_branch:
-                # Extract component type (e.g., "FLANGE", "ELBOW", "TEE")
-                parts = line.strip().split()
-                if len(parts) >= 2:
-                    component_type = parts[1]
-                    # Skip "BRANCH", "PIPE", "ZONE", "SITE", etc.
-                    if component_type not in ['BRANCH', 'PIPE', 'ZONE', 'SITE', 'STRUCTURE', 'SUBSTRUCTURE', 'CYLINDER', 'CTORUS']:
-                        current_component_type = component_type
-            
-            # Check if line contains "SPRE SPCOMPONENT"
-            elif 'SPRE SPCOMPONENT' in line and current_component_type:
-                # Extract the SPRE value after "SPRE SPCOMPONENT"
-                spre_match = re.search(r'SPRE SPCOMPONENT\s+(\S+)', line)
-                if spre_match:
-                    spre_value = spre_match.group(1)
-                    components.append({
-                        'Pipe': current_pipe,
-                        'Branch': current_branch,
-                        'Component_Type': current_component_type,
-                        'SPRE': spre_value
-                    })
+    for kind, value in get_listing_events(file_path):
+        # NEW PIPE line
+        if kind == 'pipe':
+            if value:
+                current_pipe = value
+                current_branch = None
+                current_component_type = None
+        
+        # NEW BRANCH line
+        elif kind == 'branch' and current_pipe:
+            if value:
+                current_branch = value
+                current_component_type = None
+        
+        # NEW line followed by a component type (e.g., "FLANGE", "ELBOW", "TEE")
+        elif kind == 'new' and current_branch:
+            component_type = value
+            # Skip "BRANCH", "PIPE", "ZONE", "SITE", etc.
+            if component_type is not None and component_type not in NON_COMPONENT_TYPES:
+                current_component_type = component_type
+        
+        # SPRE SPCOMPONENT line
+        elif kind == 'spre' and current_component_type:
+            if value is not None:
+                components.append({
+                    'Pipe': current_pipe,
+                    'Branch': current_branch,
+                    'Component_Type': current_component_type,
+                    'SPRE': value
+                })
     
     return components
 
+# Excel columns used by lookup_and_merge_with_excel() and load_welded_components(), all others are not read
+EXCEL_COLUMNS = ('SPRE', 'P1 CONN', 'P2 CONN', 'TYPE', 'PBOR', 'PBOR1', 'FORM')
+# Text columns are read as text directly instead of inferring their type
+EXCEL_TEXT_COLUMNS = {'SPRE': str, 'P1 CONN': str, 'P2 CONN': str, 'TYPE': str}
+# Format of the Parquet copy of the sheet, increase it whenever _read_excel_sheet() converts the sheet differently.
+# Stored with the columns in the Parquet metadata, so copies written by other code are rebuilt instead of reused
+EXCEL_CACHE_VERSION = 1
+EXCEL_CACHE_METADATA_KEY = b'weld_counter_excel_cache'
+EXCEL_CACHE_MARKER = f"{EXCEL_CACHE_VERSION}:{','.join(EXCEL_COLUMNS)}:{','.join(EXCEL_TEXT_COLUMNS)}".encode()
+
+def _parquet_cache_is_current(parquet_file, mtime):
+    # The copy must carry the Excel modification time and the marker of the current format
+    if not parquet_file.exists() or parquet_file.stat().st_mtime_ns != mtime:
+        return False
+    try:
+        metadata = pyarrow.parquet.read_schema(parquet_file).metadata or {}
+    except (OSError, pyarrow.ArrowException):
+        return False
+    return metadata.get(EXCEL_CACHE_METADATA_KEY) == EXCEL_CACHE_MARKER
+
+def _read_excel_sheet(excel_file):
+    df_excel = pd.read_excel(excel_file, usecols=lambda column: column in EXCEL_COLUMNS, dtype=EXCEL_TEXT_COLUMNS)
+    
+    # Columns mixing text and numbers (e.g. PBOR '100mm' and 100, FORM 'SWF/SWF' and 3) are kept as text,
+    # their consumers parse them via str()/float() anyway and the sheet can be stored as Parquet
+    for column in df_excel.columns[df_excel.dtypes == object]:
+        df_excel[column] = df_excel[column].map(lambda v: v if isinstance(v, str) or pd.isna(v) else str(v))
+    return df_excel
+
+@lru_cache(maxsize=4)
+def _read_excel_cached(excel_file, mtime):
+    if pyarrow is None:
+        return _read_excel_sheet(excel_file)
+    
+    # Columnar copy of the sheet next to the Excel file, stamped with the Excel modification time
+    # and reused as long as the Excel file keeps that modification time and the copy has the current format
+    parquet_file = Path(excel_file + '.parquet')
+    if _parquet_cache_is_current(parquet_file, mtime):
+        return pd.read_parquet(parquet_file)
+    
+    df_excel = _read_excel_sheet(excel_file)
+    try:
+        table = pyarrow.Table.from_pandas(df_excel, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               EXCEL_CACHE_METADATA_KEY: EXCEL_CACHE_MARKER})
+        pyarrow.parquet.write_table(table, parquet_file)
+        os.utime(parquet_file, ns=(mtime, mtime))
+    except (OSError, ValueError, pyarrow.ArrowException):
+        pass  # No cache (e.g. read-only folder), the Excel data is still returned
+    return df_excel
+
+def read_excel(excel_file):
+    """
+    Read the components Excel file, reusing the parsed DataFrame while the file is unchanged.
+    
+    The cache is keyed on path and modification time, so the (slow) Excel parse runs once for
+    lookup_and_merge_with_excel() and load_welded_components(). With pyarrow installed the sheet
+    is also kept as '<excel file>.parquet' and later runs read that instead of the workbook.
+    The returned DataFrame is shared between callers and must not be modified in place.
+    """
+    path = str(Path(excel_file).resolve())
+    return _read_excel_cached(path, Path(path).stat().st_mtime_ns)
+
 def lookup_and_merge_with_excel(components, excel_file):
     """
     Lookup SPRE values in Excel file and merge data.
@@ -471,336 +631,266 @@ def lookup_and_merge_with_excel(components, excel_file):
     - TYPE = 'OLET': 1 weld
     """
     # Read Excel file
-    df_excel = pd.read_excel(excel_file)
-    
-    # Create a dictionary for quick lookup
-    spre_lookup = {}
-    for _, row in df_excel.iterrows():
-        spre = row['SPRE']
-        spre_lookup[spre] = {
-            'P1_CONN': row['P1 CONN'] if pd.notna(row['P1 CONN']) else '',
-            'P2_CONN': row['P2 CONN'] if pd.notna(row['P2 CONN']) else '',
-            'TYPE': row['TYPE'] if pd.notna(row['TYPE']) else ''
-        }
-    
-    # Process components
-    result = []
-    for comp in components:
-        spre = comp['SPRE']
-        
-        if spre in spre_lookup:
-            found = 'X'
-            p1_conn = spre_lookup[spre]['P1_CONN']
-            p2_conn = spre_lookup[spre]['P2_CONN']
-            comp_type = spre_lookup[spre]['TYPE']
-            
-            # Calculate weld count
-            weld_count = 0
-            # Exclude WELD type components from weld counting
-            if 'WELD' not in comp_type:
-                if p1_conn == 'BWD':
-                    weld_count += 1
-                if p2_conn == 'BWD':
-                    weld_count += 1
-                if comp_type == 'OLET':
-                    weld_count += 1
-            
-            # Mark as welded if BWD connection OR TYPE is OLET (but not WELD type)
-            welded = 'X' if weld_count > 0 else ''
-        else:
-            found = ''
-            p1_conn = ''
-            p2_conn = ''
-            comp_type = ''
-            welded = ''
-            weld_count = 0
-        
-        result.append({
-            'Pipe': comp['Pipe'],
-            'Branch': comp['Branch'],
-            'Component_Type': comp['Component_Type'],
-            'SPRE': spre,
-            'Found': found,
-            'P1_CONN': p1_conn,
-            'P2_CONN': p2_conn,
-            'TYPE': comp_type,
-            'Welded': welded,
-            'Weld_Count': weld_count
-        })
-    
-    return result
+    df_excel = read_excel(excel_file)
+    
+    if not components:
+        return []
+    
+    # One lookup row per SPRE (the last one wins, as with a dictionary lookup)
+    df_lookup = (df_excel[['SPRE', 'P1 CONN', 'P2 CONN', 'TYPE']]
+                 .drop_duplicates('SPRE', keep='last')
+                 .rename(columns={'P1 CONN': 'P1_CONN', 'P2 CONN': 'P2_CONN'}))
+    df_lookup['Found'] = 'X'
+    
+    # Left merge keeps the component order; components without a match get empty values
+    df_comp = pd.DataFrame(components, columns=['Pipe', 'Branch', 'Component_Type', 'SPRE'])
+    merged = df_comp.merge(df_lookup, on='SPRE', how='left')
+    for column in ('Found', 'P1_CONN', 'P2_CONN', 'TYPE'):
+        merged[column] = merged[column].astype(object).fillna('')
+    
+    # Calculate weld count, excluding WELD type components from weld counting
+    is_weld_type = merged['TYPE'].astype(str).str.contains('WELD', regex=False)
+    weld_count = ((merged['P1_CONN'] == 'BWD').astype(int)
+                  + (merged['P2_CONN'] == 'BWD').astype(int)
+                  + (merged['TYPE'] == 'OLET').astype(int)).where(~is_weld_type, 0)
+    
+    # Mark as welded if BWD connection OR TYPE is OLET (but not WELD type)
+    merged['Welded'] = np.where(weld_count > 0, 'X', '')
+    merged['Weld_Count'] = weld_count
+    
+    return merged[['Pipe', 'Branch', 'Component_Type', 'SPRE', 'Found', 'P1_CONN', 'P2_CONN',
+                   'TYPE', 'Welded', 'Weld_Count']].to_dict('records')
 
-def detect_components_at_branch_ends(file_path, excel_file, branch_positions, tolerance=5.0):
+def calculate_component_length(comp_type, pbor, pbor1, form):
     """
-    Detect welded components directly at branch heads (HPOS) or tails (TPOS).
-    
-    A component is considered at the head/tail if:
-    - Distance from component center to HPOS/TPOS <= component_length/2 + tolerance
-    
-    Args:
-        file_path: Path to E3D database listing file
-        excel_file: Path to Excel file with component data
-        branch_positions: List of branch positions from extract_branch_positions()
-        tolerance: Distance tolerance in mm (default 5mm)
+    Calculate component length based on type and dimensions.
     
     Returns:
-        Dictionary with:
-        - 'components_at_ends': List of components at branch ends
-        - 'stats': Statistics about components at ends vs HCON/TCON BWD
+        float: Component length in mm, or None if cannot be calculated
     """
-    # Read Excel file and create lookup
-    df_excel = pd.read_excel(excel_file)
-    component_lookup = {}
-    
-    def calculate_component_length(comp_type, pbor, pbor1, form):
-        """Calculate component length based on type."""
-        if comp_type == 'ELBO':
-            if form is not None and pbor > 0:
-                try:
-                    return float(form) * pbor
-                except:
-                    return None
-            return None
-        elif comp_type == 'TEE':
-            return 0.90 * pbor if pbor > 0 else None
-        elif comp_type == 'FLAN':
-            return 0.4 * pbor if pbor > 0 else None
-        elif comp_type == 'VALV':
-            # Use PBOR if available, otherwise fallback to PBOR1
-            if pbor > 0:
-                return 0.5 * pbor
-            elif pbor1 > 0:
-                return 0.5 * pbor1
-            else:
+    if comp_type == 'ELBO':
+        # ELBO: FORM * PBOR
+        # FORM must be numeric (3 or 5)
+        if form is not None and pbor > 0:
+            try:
+                form_val = float(form)
+                return form_val * pbor
+            except:
                 return None
-        elif comp_type == 'REDU':
-            return 1.15 * pbor1 if pbor1 > 0 else None
-        elif comp_type == 'CAP':
-            return 0.0
+        return None
+    elif comp_type == 'TEE':
+        # TEE: 0.90 * PBOR
+        return 0.90 * pbor if pbor > 0 else None
+    elif comp_type == 'FLAN':
+        # FLAN: 0.4 * PBOR
+        return 0.4 * pbor if pbor > 0 else None
+    elif comp_type == 'VALV':
+        # VALV: 0.5 * PBOR (use PBOR1 as fallback)
+        if pbor > 0:
+            return 0.5 * pbor
+        elif pbor1 > 0:
+            return 0.5 * pbor1
         else:
             return None
+    elif comp_type == 'REDU':
+        # REDU: 1.15 * PBOR1
+        return 1.15 * pbor1 if pbor1 > 0 else None
+    elif comp_type == 'CAP':
+        # CAP: endpoint component, length = 0
+        return 0.0
+    else:
+        return None
+
+def load_welded_components(excel_file):
+    """
+    Read the Excel file once and build the component lookup used by
+    detect_components_at_branch_ends() and extract_component_adjacency().
     
-    for _, row in df_excel.iterrows():
-        spre = row['SPRE']
-        p1_conn = row['P1 CONN'] if pd.notna(row['P1 CONN']) else ''
-        p2_conn = row['P2 CONN'] if pd.notna(row['P2 CONN']) else ''
-        comp_type = row['TYPE'] if pd.notna(row['TYPE']) else ''
-        
-        pbor_str = row['PBOR'] if pd.notna(row['PBOR']) else '0mm'
+    Like read_excel(), the lookup is cached on path and modification time and shared between
+    callers (it must not be modified in place).
+    
+    Returns:
+        Dictionary: SPRE -> {'welded': bool, 'pbor': float, 'pbor1': float, 'type': str, 'form': float, 'length': float}
+    """
+    path = str(Path(excel_file).resolve())
+    return _load_welded_components_cached(path, Path(path).stat().st_mtime_ns)
+
+@lru_cache(maxsize=4)
+def _load_welded_components_cached(excel_file, mtime):
+    df_excel = read_excel(excel_file)
+    welded_components = {}
+    
+    def column_values(column, default):
+        # Column as a list with missing cells replaced by default
+        values = df_excel[column].astype(object)
+        return values.where(values.notna(), default).tolist()
+    
+    for spre, p1_conn, p2_conn, comp_type, pbor_str, pbor1_str, form_str in zip(
+            df_excel['SPRE'].tolist(), column_values('P1 CONN', ''), column_values('P2 CONN', ''),
+            column_values('TYPE', ''), column_values('PBOR', '0mm'), column_values('PBOR1', '0mm'),
+            column_values('FORM', None)):
+        # Parse PBOR (e.g., "100mm" -> 100.0)
         try:
             pbor = float(str(pbor_str).replace('mm', ''))
         except:
             pbor = 0.0
         
-        pbor1_str = row['PBOR1'] if pd.notna(row['PBOR1']) else '0mm'
+        # Parse PBOR1 (e.g., "15mm" -> 15.0)
         try:
             pbor1 = float(str(pbor1_str).replace('mm', ''))
         except:
             pbor1 = 0.0
         
-        form_str = row['FORM'] if pd.notna(row['FORM']) else None
+        # Parse FORM (could be numeric like '3', '5' or text like 'SWF/SWF')
         try:
             form = float(form_str) if form_str is not None else None
         except:
             form = None
         
+        # Calculate component length
         comp_length = calculate_component_length(comp_type, pbor, pbor1, form)
-        # Exclude WELD type components from welded classification
-        is_welded = (p1_conn == 'BWD' or p2_conn == 'BWD' or comp_type == 'OLET') and 'WELD' not in comp_type
         
-        component_lookup[spre] = {
-            'welded': is_welded,
+        # Include only welded components (BWD or OLET), exclude WELD type
+        is_welded = (p1_conn == 'BWD' or p2_conn == 'BWD' or comp_type == 'OLET') and 'WELD' not in comp_type
+        welded_components[spre] = {
+            'welded': is_welded, 
+            'pbor': pbor, 
+            'pbor1': pbor1,
             'type': comp_type,
-            'length': comp_length,
-            'p1_conn': p1_conn,
-            'p2_conn': p2_conn
+            'form': form,
+            'length': comp_length
         }
     
-    # Create branch position lookup
-    branch_lookup = {}
-    for branch in branch_positions:
-        branch_id = branch['Full_Branch_ID']
-        branch_lookup[branch_id] = branch
+    return welded_components
+
+# Head and tail of a branch as used for the branch-end check
+BranchEnds = namedtuple('BranchEnds', ['hpos', 'tpos', 'hcon', 'tcon'])
+
+def detect_components_at_branch_ends(file_path, excel_file, branch_positions, tolerance=5.0, welded_components=None):
+    """
+    Detect welded components directly at branch heads (HPOS) or tails (TPOS).
     
-    # Parse file to extract components with positions
-    kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-    branch_pattern = r'/B\d+'
+    A component is considered at the head/tail if:
+    - Distance from component center to HPOS/TPOS <= component_length/2 + tolerance
     
-    components_at_ends = []
+    Args:
+        file_path: Path to E3D database listing file or listing from parse_e3d_listing()
+        excel_file: Path to Excel file with component data
+        branch_positions: List of branch positions from extract_branch_positions()
+        tolerance: Distance tolerance in mm (default 5mm)
+        welded_components: Preloaded lookup from load_welded_components() (excel_file is not read when given)
+    
+    Returns:
+        Dictionary with:
+        - 'components_at_ends': List of components at branch ends
+        - 'stats': Statistics about components at ends vs HCON/TCON BWD
+    """
+    # Welded component lookup (SPRE -> welded, type, length, ...)
+    if welded_components is None:
+        welded_components = load_welded_components(excel_file)
+    # Only welded components are checked, so a single lookup per component suffices
+    welded_lookup = {spre: comp_data for spre, comp_data in welded_components.items() if comp_data['welded']}
+    
+    # Create branch position lookup (head/tail positions as tuples, None when incomplete)
+    branch_lookup = {}
+    for branch in branch_positions:
+        hpos = (branch['HPOS_X'], branch['HPOS_Y'], branch['HPOS_Z'])
+        tpos = (branch['TPOS_X'], branch['TPOS_Y'], branch['TPOS_Z'])
+        branch_lookup[branch['Full_Branch_ID']] = BranchEnds(hpos if None not in hpos else None,
+                                                             tpos if None not in tpos else None,
+                                                             branch['HCON'], branch['TCON'])
+    
+    # Parse file to collect the welded components of branches with known ends.
+    # Positions go into one contiguous buffer, the ends are checked for all components at once below
+    candidates = []  # (pipe, branch, branch_id, spre, comp_data, branch_ends) per component
+    candidate_positions = array('d')  # x, y, z of each candidate
     current_pipe = None
     current_branch = None
     current_component = None
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if 'NEW PIPE' in line:
-                match = re.search(kks_pattern, line)
-                if match:
-                    current_pipe = match.group()
-                    current_branch = None
-                    current_component = None
-            
-            elif 'NEW BRANCH' in line and current_pipe:
-                full_match = re.search(kks_pattern + branch_pattern, line)
-                if full_match:
-                    full_branch = full_match.group()
-                    branch_match = re.search(branch_pattern, full_branch)
-                    if branch_match:
-                        current_branch = branch_match.group()
-                        current_component = None
+    for kind, value in get_listing_events(file_path):
+        if kind == 'pipe':
+            if value:
+                current_pipe = value
+                current_branch = None
+                current_component = None
+        
+        elif kind == 'branch' and current_pipe:
+            if value:
+                current_branch = value
+                current_component = None
+        
+        elif (kind == 'spre' or kind == 'pos') and current_pipe and current_branch and value is not None:
+            # SPRE and POS can come in either order
+            if current_component is None:
+                current_component = {'spre': None, 'pos': None}
+            current_component[kind] = value
             
-            elif current_pipe and current_branch:
-                if line.strip().startswith('SPRE '):
-                    spre_match = re.search(r'SPRE SPCOMPONENT\s+(\S+)', line)
-                    if spre_match:
-                        spre = spre_match.group(1)
-                        if current_component is None:
-                            current_component = {'spre': spre, 'pos': None}
-                        else:
-                            current_component['spre'] = spre
-                        
-                        # If we already have a position, process the component now
-                        if current_component.get('pos') is not None:
-                            spre = current_component['spre']
-                            pos = current_component['pos']
-                            if spre in component_lookup and component_lookup[spre]['welded']:
-                                comp_data = component_lookup[spre]
-                                comp_length = comp_data['length']
-                                
-                                if comp_length is not None:
-                                    # Check against branch head and tail
-                                    branch_id = current_pipe + current_branch
-                                    if branch_id in branch_lookup:
-                                        branch_info = branch_lookup[branch_id]
-                                        hpos = (branch_info['HPOS_X'], branch_info['HPOS_Y'], branch_info['HPOS_Z'])
-                                        tpos = (branch_info['TPOS_X'], branch_info['TPOS_Y'], branch_info['TPOS_Z'])
-                                        
-                                        # Calculate distances
-                                        if all(coord is not None for coord in hpos):
-                                            dist_to_head = ((pos[0] - hpos[0])**2 + (pos[1] - hpos[1])**2 + (pos[2] - hpos[2])**2)**0.5
-                                            threshold_head = comp_length / 2.0 + tolerance
-                                            
-                                            if dist_to_head <= threshold_head:
-                                                components_at_ends.append({
-                                                    'KKS_Pipe': current_pipe,
-                                                    'Branch': current_branch,
-                                                    'Full_Branch_ID': branch_id,
-                                                    'Component_Name': spre,
-                                                    'Component_Type': comp_data['type'],
-                                                    'Component_Length': round(comp_length, 2),
-                                                    'Position': 'HEAD',
-                                                    'HCON': branch_info['HCON'],
-                                                    'Component_X': pos[0],
-                                                    'Component_Y': pos[1],
-                                                    'Component_Z': pos[2],
-                                                    'Branch_End_X': hpos[0],
-                                                    'Branch_End_Y': hpos[1],
-                                                    'Branch_End_Z': hpos[2],
-                                                    'Distance_mm': round(dist_to_head, 2),
-                                                    'Threshold_mm': round(threshold_head, 2)
-                                                })
-                                        
-                                        if all(coord is not None for coord in tpos):
-                                            dist_to_tail = ((pos[0] - tpos[0])**2 + (pos[1] - tpos[1])**2 + (pos[2] - tpos[2])**2)**0.5
-                                            threshold_tail = comp_length / 2.0 + tolerance
-                                            
-                                            if dist_to_tail <= threshold_tail:
-                                                components_at_ends.append({
-                                                    'KKS_Pipe': current_pipe,
-                                                    'Branch': current_branch,
-                                                    'Full_Branch_ID': branch_id,
-                                                    'Component_Name': spre,
-                                                    'Component_Type': comp_data['type'],
-                                                    'Component_Length': round(comp_length, 2),
-                                                    'Position': 'TAIL',
-                                                    'TCON': branch_info['TCON'],
-                                                    'Component_X': pos[0],
-                                                    'Component_Y': pos[1],
-                                                    'Component_Z': pos[2],
-                                                    'Branch_End_X': tpos[0],
-                                                    'Branch_End_Y': tpos[1],
-                                                    'Branch_End_Z': tpos[2],
-                                                    'Distance_mm': round(dist_to_tail, 2),
-                                                    'Threshold_mm': round(threshold_tail, 2)
-                                                })
-                            # Reset for next component
-                            current_component = None
-                
-                elif line.strip().startswith('POS '):
-                    pos_match = re.search(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if pos_match:
-                        pos = (float(pos_match.group(1)), float(pos_match.group(2)), float(pos_match.group(3)))
-                        if current_component is None:
-                            # POS came before SPRE, initialize component with position
-                            current_component = {'spre': None, 'pos': pos}
-                        else:
-                            current_component['pos'] = pos
-                        
-                        # If we already have both spre and pos, process the component
-                        if current_component.get('spre') is not None:
-                            spre = current_component['spre']
-                            if spre in component_lookup and component_lookup[spre]['welded']:
-                                comp_data = component_lookup[spre]
-                                comp_length = comp_data['length']
-                                
-                                if comp_length is not None:
-                                    # Check against branch head and tail
-                                    branch_id = current_pipe + current_branch
-                                    if branch_id in branch_lookup:
-                                        branch_info = branch_lookup[branch_id]
-                                        hpos = (branch_info['HPOS_X'], branch_info['HPOS_Y'], branch_info['HPOS_Z'])
-                                        tpos = (branch_info['TPOS_X'], branch_info['TPOS_Y'], branch_info['TPOS_Z'])
-                                        
-                                        # Calculate distances
-                                        if all(coord is not None for coord in hpos):
-                                            dist_to_head = ((pos[0] - hpos[0])**2 + (pos[1] - hpos[1])**2 + (pos[2] - hpos[2])**2)**0.5
-                                            threshold_head = comp_length / 2.0 + tolerance
-                                            
-                                            if dist_to_head <= threshold_head:
-                                                components_at_ends.append({
-                                                    'KKS_Pipe': current_pipe,
-                                                    'Branch': current_branch,
-                                                    'Full_Branch_ID': branch_id,
-                                                    'Component_Name': spre,
-                                                    'Component_Type': comp_data['type'],
-                                                    'Component_Length': round(comp_length, 2),
-                                                    'Position': 'HEAD',
-                                                    'HCON': branch_info['HCON'],
-                                                    'Component_X': pos[0],
-                                                    'Component_Y': pos[1],
-                                                    'Component_Z': pos[2],
-                                                    'Branch_End_X': hpos[0],
-                                                    'Branch_End_Y': hpos[1],
-                                                    'Branch_End_Z': hpos[2],
-                                                    'Distance_mm': round(dist_to_head, 2),
-                                                    'Threshold_mm': round(threshold_head, 2)
-                                                })
-                                        
-                                        if all(coord is not None for coord in tpos):
-                                            dist_to_tail = ((pos[0] - tpos[0])**2 + (pos[1] - tpos[1])**2 + (pos[2] - tpos[2])**2)**0.5
-                                            threshold_tail = comp_length / 2.0 + tolerance
-                                            
-                                            if dist_to_tail <= threshold_tail:
-                                                components_at_ends.append({
-                                                    'KKS_Pipe': current_pipe,
-                                                    'Branch': current_branch,
-                                                    'Full_Branch_ID': branch_id,
-                                                    'Component_Name': spre,
-                                                    'Component_Type': comp_data['type'],
-                                                    'Component_Length': round(comp_length, 2),
-                                                    'Position': 'TAIL',
-                                                    'TCON': branch_info['TCON'],
-                                                    'Component_X': pos[0],
-                                                    'Component_Y': pos[1],
-                                                    'Component_Z': pos[2],
-                                                    'Branch_End_X': tpos[0],
-                                                    'Branch_End_Y': tpos[1],
-                                                    'Branch_End_Z': tpos[2],
-                                                    'Distance_mm': round(dist_to_tail, 2),
-                                                    'Threshold_mm': round(threshold_tail, 2)
-                                                })
-                            # Reset for next component
-                            current_component = None
+            # Process the component once both SPRE and position are known
+            spre = current_component['spre']
+            pos = current_component['pos']
+            if spre is not None and pos is not None:
+                comp_data = welded_lookup.get(spre)
+                if comp_data is not None and comp_data['length'] is not None:
+                    branch_id = current_pipe + current_branch
+                    branch_ends = branch_lookup.get(branch_id)
+                    if branch_ends is not None:
+                        candidates.append((current_pipe, current_branch, branch_id, spre, comp_data, branch_ends))
+                        candidate_positions.extend(pos)
+                # Reset for next component
+                current_component = None
+    
+    components_at_ends = []
+    if candidates:
+        positions = np.frombuffer(candidate_positions, dtype=np.float64).reshape(-1, 3)
+        # Component at an end if its center is within half its length + tolerance
+        thresholds = np.array([comp_data['length'] for _, _, _, _, comp_data, _ in candidates], dtype=np.float64) / 2.0 + tolerance
+        thresholds_sq = thresholds * thresholds
+        missing_end = (np.nan, np.nan, np.nan)  # Never within the threshold
+        
+        def end_distances_sq(ends):
+            # Squared distances to the ends (the square root is only taken for the report)
+            diffs = positions - np.array(ends, dtype=np.float64)
+            return diffs[:, 0] * diffs[:, 0] + diffs[:, 1] * diffs[:, 1] + diffs[:, 2] * diffs[:, 2]
+        
+        dist_sq_to_head = end_distances_sq([branch_ends.hpos or missing_end for *_, branch_ends in candidates])
+        dist_sq_to_tail = end_distances_sq([branch_ends.tpos or missing_end for *_, branch_ends in candidates])
+        at_head = dist_sq_to_head <= thresholds_sq
+        at_tail = dist_sq_to_tail <= thresholds_sq
+        
+        # Reported values of the components at an end, rounded at once
+        reported = np.flatnonzero(at_head | at_tail)
+        distances_to_head = np.round(np.sqrt(dist_sq_to_head[reported]), 2).tolist()
+        distances_to_tail = np.round(np.sqrt(dist_sq_to_tail[reported]), 2).tolist()
+        rounded_thresholds = np.round(thresholds[reported], 2).tolist()
+        
+        # Report in parsing order, the head before the tail of the same component
+        for k, i in enumerate(reported.tolist()):
+            pipe, branch, branch_id, spre, comp_data, branch_ends = candidates[i]
+            x, y, z = positions[i].tolist()
+            for is_at_end, end_type, end_pos, distance, hcon, tcon in (
+                    (at_head[i], 'HEAD', branch_ends.hpos, distances_to_head[k], branch_ends.hcon, ''),
+                    (at_tail[i], 'TAIL', branch_ends.tpos, distances_to_tail[k], '', branch_ends.tcon)):
+                if is_at_end:
+                    components_at_ends.append({
+                        'KKS_Pipe': pipe,
+                        'Branch': branch,
+                        'Full_Branch_ID': branch_id,
+                        'Component_Name': spre,
+                        'Component_Type': comp_data['type'],
+                        'Component_Length': round(comp_data['length'], 2),
+                        'Position': end_type,
+                        'HCON': hcon,
+                        'TCON': tcon,
+                        'Component_X': x,
+                        'Component_Y': y,
+                        'Component_Z': z,
+                        'Branch_End_X': end_pos[0],
+                        'Branch_End_Y': end_pos[1],
+                        'Branch_End_Z': end_pos[2],
+                        'Distance_mm': distance,
+                        'Threshold_mm': rounded_thresholds[k]
+                    })
     
     # Calculate statistics
     total_hcon_bwd = sum(1 for b in branch_positions if b['HCON'] == 'BWD')
@@ -826,7 +916,215 @@ def detect_components_at_branch_ends(file_path, excel_file, branch_positions, to
         'stats': stats
     }
 
-def extract_component_adjacency(file_path, excel_file, distance_threshold_close=50.0, distance_threshold_near=150.0):
+# Define valid component type pairs (order-independent, stored as alphabetically sorted tuples)
+VALID_PAIRS = {
+    ('ELBO', 'ELBO'),
+    ('ELBO', 'REDU'),
+    ('ELBO', 'FLAN'),
+    ('ELBO', 'TEE'),
+    ('CAP', 'ELBO'),
+    ('ELBO', 'VALV'),
+    ('REDU', 'TEE'),
+    ('TEE', 'TEE'),
+    ('CAP', 'TEE'),
+    ('FLAN', 'TEE'),
+    ('FLAN', 'REDU'),
+    ('CAP', 'REDU'),
+    ('REDU', 'REDU'),
+    ('REDU', 'VALV')
+}
+
+# Welded component of a branch as used for the adjacency check
+WeldedComponent = namedtuple('WeldedComponent', ['spre', 'type', 'pbor', 'pbor1', 'length', 'x', 'y', 'z'])
+
+class Relationship(IntEnum):
+    """
+    Relationship of two consecutive welded components.
+    Stored as int for fast filtering and counting, written to the CSV by its name ('Touching', 'Near', 'Separated').
+    """
+    TOUCHING = 0
+    NEAR = 1
+    SEPARATED = 2
+    
+    def __str__(self):
+        return self.name.capitalize()
+
+# Relationship members indexed by their int value
+RELATIONSHIPS = tuple(Relationship)
+
+# Type codes for the expected touching distance (all other types are 0)
+PAIR_TYPE_CODES = {'ELBO': 1, 'CAP': 2}
+
+def classify_component_pairs_numpy(positions, lengths, codes):
+    """
+    Classify consecutive components from their positions, lengths and type codes (ELBO=1, CAP=2, other=0).
+    
+    Returns:
+        Tuple of (distances, expected touching distances, Relationship codes) for the consecutive pairs
+    """
+    # Squared 3D distance between consecutive components
+    diffs = positions[:-1] - positions[1:]
+    distances_sq = np.einsum('ij,ij->i', diffs, diffs)
+    
+    # Expected touching distance from the type codes of both components
+    code1, code2 = codes[:-1], codes[1:]
+    w1 = np.where(((code2 == 1) & (code1 != 1)) | ((code1 == 2) & (code2 == 0)), 0.0, 1.0)
+    w2 = np.where(((code1 == 1) & (code2 != 1)) | ((code2 == 2) & (code1 != 1)), 0.0, 1.0)
+    expected = w1 * lengths[:-1] + w2 * lengths[1:]
+    
+    # Touching within expected +10%, near within expected +50%
+    # Compare squared values (thresholds are never negative), the square root is only needed for the report
+    thresholds_touching = expected * 1.10
+    thresholds_near = expected * 1.50
+    relationships = np.select([distances_sq <= thresholds_touching * thresholds_touching,
+                               distances_sq <= thresholds_near * thresholds_near],
+                              [Relationship.TOUCHING, Relationship.NEAR], default=Relationship.SEPARATED)
+    
+    return np.sqrt(distances_sq), expected, relationships
+
+def classify_component_pairs_loop(positions, lengths, codes):
+    """
+    Same as classify_component_pairs_numpy() as a single loop without temporary arrays.
+    Only fast when compiled with numba.
+    """
+    n = len(lengths) - 1
+    distances = np.empty(n)
+    expected = np.empty(n)
+    relationships = np.empty(n, dtype=np.int8)
+    for i in range(n):
+        dx = positions[i, 0] - positions[i + 1, 0]
+        dy = positions[i, 1] - positions[i + 1, 1]
+        dz = positions[i, 2] - positions[i + 1, 2]
+        distance_sq = dx * dx + dy * dy + dz * dz
+        
+        code1 = codes[i]
+        code2 = codes[i + 1]
+        w1 = 0.0 if (code2 == 1 and code1 != 1) or (code1 == 2 and code2 == 0) else 1.0
+        w2 = 0.0 if (code1 == 1 and code2 != 1) or (code2 == 2 and code1 != 1) else 1.0
+        expected_distance = w1 * lengths[i] + w2 * lengths[i + 1]
+        
+        threshold_touching = expected_distance * 1.10
+        threshold_near = expected_distance * 1.50
+        if distance_sq <= threshold_touching * threshold_touching:
+            relationships[i] = 0  # Relationship.TOUCHING
+        elif distance_sq <= threshold_near * threshold_near:
+            relationships[i] = 1  # Relationship.NEAR
+        else:
+            relationships[i] = 2  # Relationship.SEPARATED
+        
+        distances[i] = np.sqrt(distance_sq)
+        expected[i] = expected_distance
+    
+    return distances, expected, relationships
+
+# Use the compiled loop when numba is installed
+if njit is not None:
+    classify_component_pairs = njit(cache=True)(classify_component_pairs_loop)
+else:
+    classify_component_pairs = classify_component_pairs_numpy
+
+def build_component_pairs(components, coordinates, lengths, branch_groups):
+    """
+    Classify consecutive welded components of each branch as Touching, Near or Separated.
+    
+    Distances and expected touching distances are computed for all consecutive pairs of
+    all branches at once by classify_component_pairs(); pairs spanning two branches are
+    dropped afterwards. Component types are encoded as ELBO=1, CAP=2, other=0
+    (PAIR_TYPE_CODES) and the expected distance is w1 * length1 + w2 * length2 with 0/1
+    weights from the type codes:
+    - ELBO to ELBO: sum of both lengths
+    - ELBO to other: just the ELBO length
+    - CAP involved (no ELBO): the other component's length
+    - Other combinations: sum of both lengths
+    
+    Args:
+        components: List of WeldedComponent records of a file
+        coordinates: array('d') with x, y, z of each component
+        lengths: array('d') with the length of each component (NaN when unknown)
+        branch_groups: List of (pipe, branch, first, end) component index ranges of the branches
+    
+    Returns:
+        List of component pair dictionaries (valid type pairs with known lengths only)
+    """
+    if not branch_groups:
+        return []
+    
+    # Component indices of all branches one after another (ranges can overlap when a branch was classified twice)
+    order = np.concatenate([np.arange(first, end) for _, _, first, end in branch_groups])
+    positions = np.frombuffer(coordinates, dtype=np.float64).reshape(-1, 3)[order]
+    lengths = np.frombuffer(lengths, dtype=np.float64)[order]
+    
+    # Distances, expected touching distances and relationships of all consecutive pairs
+    codes = np.array([PAIR_TYPE_CODES.get(comp.type, 0) for comp in components], dtype=np.int64)[order]
+    distances, expected, relationships = classify_component_pairs(positions, lengths, codes)
+    
+    # Branch of each component: consecutive pairs must stay within one branch
+    group_ids = np.repeat(np.arange(len(branch_groups)), [end - first for _, _, first, end in branch_groups])
+    
+    # Valid component type pairs (order-independent) as a lookup table over the types present
+    type_index = {comp_type: k for k, comp_type in enumerate(dict.fromkeys(comp.type for comp in components))}
+    type_ids = np.array([type_index[comp.type] for comp in components], dtype=np.intp)[order]
+    valid_types = np.array([[(type1, type2) in VALID_PAIRS or (type2, type1) in VALID_PAIRS for type2 in type_index]
+                            for type1 in type_index], dtype=bool)
+    
+    # Keep pairs within one branch, of a valid type pair and with known lengths of both components
+    has_length = ~np.isnan(lengths)
+    pair_idx = np.flatnonzero((group_ids[:-1] == group_ids[1:])
+                              & valid_types[type_ids[:-1], type_ids[1:]]
+                              & has_length[:-1] & has_length[1:])
+    
+    # Records of the ordered components and their branch for building the rows
+    ordered_components = [components[i] for i in order.tolist()]
+    group_ids = group_ids.tolist()
+    
+    # Apply margins for the report: touching +10%, near +50% (kept pairs only)
+    expected = expected[pair_idx]
+    thresholds_touching = expected * 1.10
+    thresholds_near = expected * 1.50
+    
+    # Round the reported values of all kept pairs at once
+    rounded_lengths = np.round(lengths, 2)
+    
+    component_pairs = []
+    for k, length1, length2, distance, expected_distance, threshold_touching, threshold_near, relationship in zip(
+            pair_idx.tolist(), rounded_lengths[pair_idx].tolist(), rounded_lengths[pair_idx + 1].tolist(),
+            np.round(distances[pair_idx], 2).tolist(), np.round(expected, 2).tolist(),
+            np.round(thresholds_touching, 2).tolist(), np.round(thresholds_near, 2).tolist(),
+            relationships[pair_idx].tolist()):
+        pipe, branch, _, _ = branch_groups[group_ids[k]]
+        
+        # Unpack both records once instead of repeated attribute lookups
+        spre1, type1, pbor1, _, _, x1, y1, z1 = ordered_components[k]
+        spre2, type2, pbor2, _, _, x2, y2, z2 = ordered_components[k + 1]
+        
+        component_pairs.append({
+            'KKS_Pipe': pipe,
+            'Branch': branch,
+            'Component_1_Name': spre1,
+            'Component_1_Type': type1,
+            'Component_1_PBOR': pbor1,
+            'Component_1_Length': length1,
+            'Component_1_X': x1,
+            'Component_1_Y': y1,
+            'Component_1_Z': z1,
+            'Component_2_Name': spre2,
+            'Component_2_Type': type2,
+            'Component_2_PBOR': pbor2,
+            'Component_2_Length': length2,
+            'Component_2_X': x2,
+            'Component_2_Y': y2,
+            'Component_2_Z': z2,
+            'Distance_mm': distance,
+            'Expected_Distance_mm': expected_distance,
+            'Threshold_Touching': threshold_touching,
+            'Threshold_Near': threshold_near,
+            'Relationship': RELATIONSHIPS[relationship]
+        })
+    
+    return component_pairs
+
+def extract_component_adjacency(file_path, excel_file=None, distance_threshold_close=50.0, distance_threshold_near=150.0,
+                                welded_components=None):
     """
     Extract component pairs that are close to each other (potentially touching/welded).
     Only processes components that have welds (BWD connections or OLET type).
@@ -841,411 +1139,202 @@ def extract_component_adjacency(file_path, excel_file, distance_threshold_close=
     - Near: PBOR * 2 + 100mm (accounts for component size + moderate gap)
     
     Args:
-        file_path: Path to E3D database listing file
+        file_path: Path to E3D database listing file or listing from parse_e3d_listing()
         excel_file: Path to Excel file with component data (P1 CONN, P2 CONN, TYPE, PBOR)
         distance_threshold_close: Not used (kept for backward compatibility)
         distance_threshold_near: Not used (kept for backward compatibility)
+        welded_components: Preloaded lookup from load_welded_components() (excel_file is not read when given)
     
     Returns:
         List of component pairs with distance information
     """
-    # Define valid component type pairs (order-independent)
-    VALID_PAIRS = {
-        frozenset(['ELBO', 'ELBO']),
-        frozenset(['ELBO', 'REDU']),
-        frozenset(['ELBO', 'FLAN']),
-        frozenset(['ELBO', 'TEE']),
-        frozenset(['ELBO', 'CAP']),
-        frozenset(['ELBO', 'VALV']),
-        frozenset(['TEE', 'REDU']),
-        frozenset(['TEE', 'TEE']),
-        frozenset(['TEE', 'CAP']),
-        frozenset(['TEE', 'FLAN']),
-        frozenset(['REDU', 'FLAN']),
-        frozenset(['REDU', 'CAP']),
-        frozenset(['REDU', 'REDU']),
-        frozenset(['REDU', 'VALV'])
-    }
-    
-    # Read Excel file and create lookup for welded components with PBOR, PBOR1, FORM
-    df_excel = pd.read_excel(excel_file)
-    welded_components = {}  # Dictionary: SPRE -> {'welded': bool, 'pbor': float, 'pbor1': float, 'type': str, 'form': float, 'length': float}
-    
-    def calculate_component_length(comp_type, pbor, pbor1, form):
-        """
-        Calculate component length based on type and dimensions.
-        
-        Returns:
-            float: Component length in mm, or None if cannot be calculated
-        """
-        if comp_type == 'ELBO':
-            # ELBO: FORM * PBOR
-            # FORM must be numeric (3 or 5)
-            if form is not None and pbor > 0:
-                try:
-                    form_val = float(form)
-                    return form_val * pbor
-                except:
-                    return None
-            return None
-        elif comp_type == 'TEE':
-            # TEE: 0.90 * PBOR
-            return 0.90 * pbor if pbor > 0 else None
-        elif comp_type == 'FLAN':
-            # FLAN: 0.4 * PBOR
-            return 0.4 * pbor if pbor > 0 else None
-        elif comp_type == 'VALV':
-            # VALV: 0.5 * PBOR (use PBOR1 as fallback)
-            if pbor > 0:
-                return 0.5 * pbor
-            elif pbor1 > 0:
-                return 0.5 * pbor1
-            else:
-                return None
-        elif comp_type == 'REDU':
-            # REDU: 1.15 * PBOR1
-            return 1.15 * pbor1 if pbor1 > 0 else None
-        elif comp_type == 'CAP':
-            # CAP: endpoint component, length = 0
-            return 0.0
-        else:
-            return None
-    
-    for _, row in df_excel.iterrows():
-        spre = row['SPRE']
-        p1_conn = row['P1 CONN'] if pd.notna(row['P1 CONN']) else ''
-        p2_conn = row['P2 CONN'] if pd.notna(row['P2 CONN']) else ''
-        comp_type = row['TYPE'] if pd.notna(row['TYPE']) else ''
-        
-        # Parse PBOR (e.g., "100mm" -> 100.0)
-        pbor_str = row['PBOR'] if pd.notna(row['PBOR']) else '0mm'
-        try:
-            pbor = float(str(pbor_str).replace('mm', ''))
-        except:
-            pbor = 0.0
-        
-        # Parse PBOR1 (e.g., "15mm" -> 15.0)
-        pbor1_str = row['PBOR1'] if pd.notna(row['PBOR1']) else '0mm'
-        try:
-            pbor1 = float(str(pbor1_str).replace('mm', ''))
-        except:
-            pbor1 = 0.0
-        
-        # Parse FORM (could be numeric like '3', '5' or text like 'SWF/SWF')
-        form_str = row['FORM'] if pd.notna(row['FORM']) else None
-        try:
-            form = float(form_str) if form_str is not None else None
-        except:
-            form = None
-        
-        # Calculate component length
-        comp_length = calculate_component_length(comp_type, pbor, pbor1, form)
-        
-        # Include only welded components (BWD or OLET), exclude WELD type
-        is_welded = (p1_conn == 'BWD' or p2_conn == 'BWD' or comp_type == 'OLET') and 'WELD' not in comp_type
-        welded_components[spre] = {
-            'welded': is_welded, 
-            'pbor': pbor, 
-            'pbor1': pbor1,
-            'type': comp_type,
-            'form': form,
-            'length': comp_length
-        }
-    
-    kks_pattern = r'\d[A-Z]{3}\d{2}BR\d{3}'
-    branch_pattern = r'/B\d+'
+    # Welded component lookup (SPRE -> welded, pbor, pbor1, type, form, length)
+    if welded_components is None:
+        welded_components = load_welded_components(excel_file)
+    # Only welded components are checked, so a single lookup per component suffices
+    welded_lookup = {spre: comp_data for spre, comp_data in welded_components.items() if comp_data['welded']}
     
-    component_pairs = []
+    # Welded components of the file in parsing order, coordinates and lengths in contiguous buffers
+    components = []
+    coordinates = array('d')  # x, y, z of each component
+    lengths = array('d')  # Length of each component, NaN when unknown
+    # (pipe, branch, first, end) component index ranges of the branches to classify, all at once at the end.
+    # A branch can be classified again after it grew, the range then covers all its components so far.
+    branch_groups = []
     current_pipe = None
     current_branch = None
-    branch_components = []  # List of (component_type, spre, position, pbor) for current branch - only welded ones
+    branch_start = 0  # Index of the first welded component of the current branch
     current_component = None  # Track the component being built
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Check if line contains "NEW PIPE"
-            if 'NEW PIPE' in line:
-                match = re.search(kks_pattern, line)
-                if match:
-                    # Process previous branch's components before resetting
-                    if current_pipe and current_branch and len(branch_components) > 1:
-                        # Analyze pairs of consecutive components
-                        for i in range(len(branch_components) - 1):
-                            comp1 = branch_components[i]
-                            comp2 = branch_components[i + 1]
-                            
-                            # Check if this is a valid component type pair
-                            type_pair = frozenset([comp1['type'], comp2['type']])
-                            if type_pair not in VALID_PAIRS:
-                                continue  # Skip this pair
-                            
-                            # Skip if either component has no valid length
-                            if comp1['length'] is None or comp2['length'] is None:
-                                continue
-                            
-                            # Calculate 3D distance between components
-                            distance = ((comp1['pos'][0] - comp2['pos'][0])**2 + 
-                                       (comp1['pos'][1] - comp2['pos'][1])**2 + 
-                                       (comp1['pos'][2] - comp2['pos'][2])**2)**0.5
-                            
-                            # Calculate expected touching distance based on component types
-                            if comp1['type'] == 'ELBO' and comp2['type'] == 'ELBO':
-                                # ELBO to ELBO: sum of both lengths
-                                expected_distance = comp1['length'] + comp2['length']
-                            elif comp1['type'] == 'ELBO':
-                                # ELBO to other: just ELBO length
-                                expected_distance = comp1['length']
-                            elif comp2['type'] == 'ELBO':
-                                # Other to ELBO: just ELBO length
-                                expected_distance = comp2['length']
-                            elif comp1['type'] == 'CAP' or comp2['type'] == 'CAP':
-                                # If CAP is involved, use the other component's length
-                                expected_distance = comp1['length'] if comp2['type'] == 'CAP' else comp2['length']
-                            else:
-                                # Other combinations: sum of both lengths
-                                expected_distance = comp1['length'] + comp2['length']
-                            
-                            # Apply margins: touching ±10%, near ±50%, separated ±100%
-                            threshold_touching = expected_distance * 1.10  # +10% margin
-                            threshold_near = expected_distance * 1.50  # +50% margin
-                            threshold_separated = expected_distance * 2.00  # +100% margin
-                            
-                            # Determine relationship
-                            if distance <= threshold_touching:
-                                relationship = 'Touching'
-                            elif distance <= threshold_near:
-                                relationship = 'Near'
-                            else:
-                                relationship = 'Separated'
-                            
-                            component_pairs.append({
-                                'KKS_Pipe': current_pipe,
-                                'Branch': current_branch,
-                                'Component_1_Name': comp1['spre'],
-                                'Component_1_Type': comp1['type'],
-                                'Component_1_PBOR': comp1['pbor'],
-                                'Component_1_Length': round(comp1['length'], 2),
-                                'Component_1_X': comp1['pos'][0],
-                                'Component_1_Y': comp1['pos'][1],
-                                'Component_1_Z': comp1['pos'][2],
-                                'Component_2_Name': comp2['spre'],
-                                'Component_2_Type': comp2['type'],
-                                'Component_2_PBOR': comp2['pbor'],
-                                'Component_2_Length': round(comp2['length'], 2),
-                                'Component_2_X': comp2['pos'][0],
-                                'Component_2_Y': comp2['pos'][1],
-                                'Component_2_Z': comp2['pos'][2],
-                                'Distance_mm': round(distance, 2),
-                                'Expected_Distance_mm': round(expected_distance, 2),
-                                'Threshold_Touching': round(threshold_touching, 2),
-                                'Threshold_Near': round(threshold_near, 2),
-                                'Relationship': relationship
-                            })
-                    
-                    current_pipe = match.group()
-                    current_branch = None
-                    branch_components = []
-            
-            # Check if line contains "NEW BRANCH"
-            elif 'NEW BRANCH' in line and current_pipe:
+    for kind, value in get_listing_events(file_path):
+        # NEW PIPE line
+        if kind == 'pipe':
+            if value:
                 # Process previous branch's components before resetting
-                if current_branch and len(branch_components) > 1:
-                    for i in range(len(branch_components) - 1):
-                        comp1 = branch_components[i]
-                        comp2 = branch_components[i + 1]
-                        
-                        # Check if this is a valid component type pair
-                        type_pair = frozenset([comp1['type'], comp2['type']])
-                        if type_pair not in VALID_PAIRS:
-                            continue  # Skip this pair
-                        
-                        # Skip if either component has no valid length
-                        if comp1['length'] is None or comp2['length'] is None:
-                            continue
-                        
-                        distance = ((comp1['pos'][0] - comp2['pos'][0])**2 + 
-                                   (comp1['pos'][1] - comp2['pos'][1])**2 + 
-                                   (comp1['pos'][2] - comp2['pos'][2])**2)**0.5
-                        
-                        # Calculate expected touching distance based on component types
-                        if comp1['type'] == 'ELBO' and comp2['type'] == 'ELBO':
-                            expected_distance = comp1['length'] + comp2['length']
-                        elif comp1['type'] == 'ELBO':
-                            expected_distance = comp1['length']
-                        elif comp2['type'] == 'ELBO':
-                            expected_distance = comp2['length']
-                        elif comp1['type'] == 'CAP' or comp2['type'] == 'CAP':
-                            expected_distance = comp1['length'] if comp2['type'] == 'CAP' else comp2['length']
-                        else:
-                            expected_distance = comp1['length'] + comp2['length']
-                        
-                        threshold_touching = expected_distance * 1.10
-                        threshold_near = expected_distance * 1.50
-                        
-                        if distance <= threshold_touching:
-                            relationship = 'Touching'
-                        elif distance <= threshold_near:
-                            relationship = 'Near'
-                        else:
-                            relationship = 'Separated'
-                        
-                        component_pairs.append({
-                            'KKS_Pipe': current_pipe,
-                            'Branch': current_branch,
-                            'Component_1_Name': comp1['spre'],
-                            'Component_1_Type': comp1['type'],
-                            'Component_1_PBOR': comp1['pbor'],
-                            'Component_1_Length': round(comp1['length'], 2),
-                            'Component_1_X': comp1['pos'][0],
-                            'Component_1_Y': comp1['pos'][1],
-                            'Component_1_Z': comp1['pos'][2],
-                            'Component_2_Name': comp2['spre'],
-                            'Component_2_Type': comp2['type'],
-                            'Component_2_PBOR': comp2['pbor'],
-                            'Component_2_Length': round(comp2['length'], 2),
-                            'Component_2_X': comp2['pos'][0],
-                            'Component_2_Y': comp2['pos'][1],
-                            'Component_2_Z': comp2['pos'][2],
-                            'Distance_mm': round(distance, 2),
-                            'Expected_Distance_mm': round(expected_distance, 2),
-                            'Threshold_Touching': round(threshold_touching, 2),
-                            'Threshold_Near': round(threshold_near, 2),
-                            'Relationship': relationship
-                        })
+                if current_pipe and current_branch and len(components) - branch_start > 1:
+                    branch_groups.append((current_pipe, current_branch, branch_start, len(components)))
                 
-                full_match = re.search(kks_pattern + branch_pattern, line)
-                if full_match:
-                    full_branch = full_match.group()
-                    branch_match = re.search(branch_pattern, full_branch)
-                    if branch_match:
-                        current_branch = branch_match.group()
-                        branch_components = []
-                        current_component = None
-            
-            # Check if line starts with "NEW " followed by a component type
-            elif line.strip().startswith('NEW ') and current_branch:
-                parts = line.strip().split()
-                if len(parts) >= 2:
-                    component_type = parts[1]
-                    # Exclude ATTACHMENT and structural elements  
-                    # Include only piping components: FLANGE, ELBOW, TEE, REDUCER, VALVE, etc.
-                    if component_type not in ['BRANCH', 'PIPE', 'ZONE', 'SITE', 'STRUCTURE', 
-                                              'SUBSTRUCTURE', 'CYLINDER', 'CTORUS', 'ATTACHMENT']:
-                        current_component = {
-                            'type': component_type, 
-                            'spre': None, 
-                            'pos': None, 
-                            'pbor': 0.0,
-                            'pipe': current_pipe,
-                            'branch': current_branch
-                        }
-            
-            # Extract SPRE for current component
-            elif 'SPRE SPCOMPONENT' in line and current_component:
-                if current_component['spre'] is None:
-                    spre_match = re.search(r'SPRE SPCOMPONENT\s+(\S+)', line)
-                    if spre_match:
-                        current_component['spre'] = spre_match.group(1)
-                        # Component is complete if both spre and pos are set
-                        # Only add if it's a welded component
-                        if current_component['pos'] is not None:
-                            spre = current_component['spre']
-                            if spre in welded_components and welded_components[spre]['welded']:
-                                current_component['pbor'] = welded_components[spre]['pbor']
-                                current_component['pbor1'] = welded_components[spre]['pbor1']
-                                current_component['type'] = welded_components[spre]['type']  # Use type from Excel
-                                current_component['length'] = welded_components[spre]['length']
-                                branch_components.append(current_component)
-                            current_component = None
+                current_pipe = value
+                current_branch = None
+                branch_start = len(components)
+        
+        # NEW BRANCH line
+        elif kind == 'branch' and current_pipe:
+            # Process previous branch's components before resetting
+            if current_branch and len(components) - branch_start > 1:
+                branch_groups.append((current_pipe, current_branch, branch_start, len(components)))
             
-            # Extract position for current component
-            elif line.strip().startswith('POS ') and current_component:
-                if current_component['pos'] is None:
-                    pos_match = re.search(r'POS X ([\d.-]+)mm Y ([\d.-]+)mm Z ([\d.-]+)mm', line)
-                    if pos_match:
-                        current_component['pos'] = (
-                            float(pos_match.group(1)),
-                            float(pos_match.group(2)),
-                            float(pos_match.group(3))
-                        )
-                        # Component is complete if both spre and pos are set
-                        # Only add if it's a welded component
-                        if current_component['spre'] is not None:
-                            spre = current_component['spre']
-                            if spre in welded_components and welded_components[spre]['welded']:
-                                current_component['pbor'] = welded_components[spre]['pbor']
-                                current_component['pbor1'] = welded_components[spre]['pbor1']
-                                current_component['type'] = welded_components[spre]['type']  # Use type from Excel
-                                current_component['length'] = welded_components[spre]['length']
-                                branch_components.append(current_component)
-                            current_component = None
+            if value:
+                current_branch = value
+                branch_start = len(components)
+                current_component = None
+        
+        # NEW line followed by a component type
+        elif kind == 'new' and current_branch:
+            component_type = value
+            # Exclude ATTACHMENT and structural elements  
+            # Include only piping components: FLANGE, ELBOW, TEE, REDUCER, VALVE, etc.
+            if component_type is not None and component_type not in NON_PIPING_COMPONENT_TYPES:
+                current_component = {
+                    'type': component_type, 
+                    'spre': None, 
+                    'pos': None
+                }
+        
+        # Extract SPRE for current component
+        elif kind == 'spre' and current_component:
+            if current_component['spre'] is None and value is not None:
+                current_component['spre'] = value
+                # Component is complete if both spre and pos are set
+                # Only add if it's a welded component
+                if current_component['pos'] is not None:
+                    spre = current_component['spre']
+                    comp_data = welded_lookup.get(spre)
+                    if comp_data is not None:
+                        pos = current_component['pos']
+                        # Use type from Excel
+                        components.append(WeldedComponent(spre, comp_data['type'], comp_data['pbor'], comp_data['pbor1'],
+                                                           comp_data['length'], pos[0], pos[1], pos[2]))
+                        coordinates.extend(pos)
+                        lengths.append(np.nan if comp_data['length'] is None else comp_data['length'])
+                    current_component = None
+        
+        # Extract position for current component
+        elif kind == 'pos' and current_component:
+            if current_component['pos'] is None and value is not None:
+                current_component['pos'] = value
+                # Component is complete if both spre and pos are set
+                # Only add if it's a welded component
+                if current_component['spre'] is not None:
+                    spre = current_component['spre']
+                    comp_data = welded_lookup.get(spre)
+                    if comp_data is not None:
+                        pos = current_component['pos']
+                        # Use type from Excel
+                        components.append(WeldedComponent(spre, comp_data['type'], comp_data['pbor'], comp_data['pbor1'],
+                                                           comp_data['length'], pos[0], pos[1], pos[2]))
+                        coordinates.extend(pos)
+                        lengths.append(np.nan if comp_data['length'] is None else comp_data['length'])
+                    current_component = None
     
     # Don't forget the last branch
-    if current_branch and len(branch_components) > 1:
-        for i in range(len(branch_components) - 1):
-            comp1 = branch_components[i]
-            comp2 = branch_components[i + 1]
-            
-            # Check if this is a valid component type pair
-            type_pair = frozenset([comp1['type'], comp2['type']])
-            if type_pair not in VALID_PAIRS:
-                continue  # Skip this pair
-            
-            # Skip if either component has no valid length
-            if comp1['length'] is None or comp2['length'] is None:
+    if current_branch and len(components) - branch_start > 1:
+        branch_groups.append((current_pipe, current_branch, branch_start, len(components)))
+    
+    return build_component_pairs(components, coordinates, lengths, branch_groups)
+
+def process_txt_file(txt_file, welded_components):
+    """
+    Run all per-file extractions for one TXT file.
+    Module-level so it can be executed in a worker process.
+    
+    The file is read and tokenized once; the extractors only replay the shared event list,
+    which takes a few ms per extractor against ~50 ms for reading and tokenizing a TBY listing.
+    
+    Args:
+        txt_file: Path to E3D database listing file
+        welded_components: Lookup from load_welded_components()
+    
+    Returns:
+        Tuple of (components, branches, branch_positions, component_pairs)
+    """
+    # Read the file once and share it between all extractors
+    listing = parse_e3d_listing(txt_file)
+    
+    # Extract components from branches
+    components = extract_components_from_branches(listing)
+    
+    # Extract branch connection information
+    branches = extract_branch_connections(listing)
+    
+    # Extract branch positions
+    branch_positions = extract_branch_positions(listing)
+    
+    # Extract component adjacency (touching components) - only welded components
+    component_pairs = extract_component_adjacency(listing, distance_threshold_close=50.0, distance_threshold_near=150.0,
+                                                  welded_components=welded_components)
+    
+    return components, branches, branch_positions, component_pairs
+
+def count_component_relationships(component_pairs):
+    """
+    Count the component pairs per relationship.
+    
+    Returns:
+        Tuple of (counts indexed by Relationship, touching pairs without OLETs and FLANGE-FLANGE pairs)
+    """
+    relationships = np.fromiter((p['Relationship'] for p in component_pairs), dtype=np.intp, count=len(component_pairs))
+    relationship_counts = np.bincount(relationships, minlength=len(Relationship))
+    
+    # Touching pairs are counted as welds except those with an OLET and FLANGE-FLANGE pairs.
+    # The type masks are only needed when one of these types occurs at all
+    touching_count_filtered = int(relationship_counts[Relationship.TOUCHING])
+    pair_types = {p['Component_1_Type'] for p in component_pairs} | {p['Component_2_Type'] for p in component_pairs}
+    if not pair_types.isdisjoint(('OLET', 'FLANGE')):
+        types1 = np.array([p['Component_1_Type'] for p in component_pairs], dtype=object)
+        types2 = np.array([p['Component_2_Type'] for p in component_pairs], dtype=object)
+        is_excluded = (types1 == 'OLET') | (types2 == 'OLET') | ((types1 == 'FLANGE') & (types2 == 'FLANGE'))
+        touching_count_filtered -= int(np.count_nonzero((relationships == Relationship.TOUCHING) & is_excluded))
+    
+    return relationship_counts, touching_count_filtered
+
+def iter_bwd_connections(branch_positions, closest_at_head, closest_at_tail):
+    """
+    Generate the BWD connections report rows, one per branch end with HCON/TCON = BWD.
+    
+    Args:
+        branch_positions: List of branch positions from extract_branch_positions()
+        closest_at_head: Branch ID -> closest component at the head ({'name', 'type', 'distance'})
+        closest_at_tail: Branch ID -> closest component at the tail
+    
+    Yields:
+        Row tuples (KKS_Pipe, Branch, Full_Branch_ID, End_Type, Connection_Type,
+        Has_Component_At_End, Component_Name, Component_Type, Distance_To_End_mm)
+    """
+    for branch in branch_positions:
+        branch_id = branch['Full_Branch_ID']
+        
+        for end_type, connection_type, closest_lookup in (('HEAD', branch['HCON'], closest_at_head),
+                                                          ('TAIL', branch['TCON'], closest_at_tail)):
+            if connection_type != 'BWD':
                 continue
             
-            distance = ((comp1['pos'][0] - comp2['pos'][0])**2 + 
-                       (comp1['pos'][1] - comp2['pos'][1])**2 + 
-                       (comp1['pos'][2] - comp2['pos'][2])**2)**0.5
-            
-            # Calculate expected touching distance based on component types
-            if comp1['type'] == 'ELBO' and comp2['type'] == 'ELBO':
-                expected_distance = comp1['length'] + comp2['length']
-            elif comp1['type'] == 'ELBO':
-                expected_distance = comp1['length']
-            elif comp2['type'] == 'ELBO':
-                expected_distance = comp2['length']
-            elif comp1['type'] == 'CAP' or comp2['type'] == 'CAP':
-                expected_distance = comp1['length'] if comp2['type'] == 'CAP' else comp2['length']
-            else:
-                expected_distance = comp1['length'] + comp2['length']
-            
-            threshold_touching = expected_distance * 1.10
-            threshold_near = expected_distance * 1.50
-            
-            if distance <= threshold_touching:
-                relationship = 'Touching'
-            elif distance <= threshold_near:
-                relationship = 'Near'
+            closest = closest_lookup.get(branch_id)
+            if closest is not None:
+                yield (branch['Pipe'], branch['Branch'], branch_id, end_type, connection_type,
+                       'Yes', closest['name'], closest['type'], closest['distance'])
             else:
-                relationship = 'Separated'
-            
-            component_pairs.append({
-                'KKS_Pipe': current_pipe,
-                'Branch': current_branch,
-                'Component_1_Name': comp1['spre'],
-                'Component_1_Type': comp1['type'],
-                'Component_1_PBOR': comp1['pbor'],
-                'Component_1_Length': round(comp1['length'], 2),
-                'Component_1_X': comp1['pos'][0],
-                'Component_1_Y': comp1['pos'][1],
-                'Component_1_Z': comp1['pos'][2],
-                'Component_2_Name': comp2['spre'],
-                'Component_2_Type': comp2['type'],
-                'Component_2_PBOR': comp2['pbor'],
-                'Component_2_Length': round(comp2['length'], 2),
-                'Component_2_X': comp2['pos'][0],
-                'Component_2_Y': comp2['pos'][1],
-                'Component_2_Z': comp2['pos'][2],
-                'Distance_mm': round(distance, 2),
-                'Expected_Distance_mm': round(expected_distance, 2),
-                'Threshold_Touching': round(threshold_touching, 2),
-                'Threshold_Near': round(threshold_near, 2),
-                'Relationship': relationship
-            })
-    
-    return component_pairs
+                yield (branch['Pipe'], branch['Branch'], branch_id, end_type, connection_type,
+                       'No', '', '', None)
+
+def write_csv(output_file, fieldnames, rows):
+    """
+    Write a list of row dicts to a CSV file, columns in fieldnames order.
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(fieldnames)
+        writer.writerows(map(itemgetter(*fieldnames), rows))
 
 def save_to_csv(data, output_file):
     """
@@ -1257,11 +1346,11 @@ def save_to_csv(data, output_file):
     
     with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
         fieldnames = ['Pipe', 'Branch', 'Component_Type', 'SPRE', 'Found', 'P1_CONN', 'P2_CONN', 'TYPE', 'Welded', 'Weld_Count']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.writer(csvfile)
         
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
+        # Plain rows in fieldnames order (missing values written as empty, like DictWriter)
+        writer.writerow(fieldnames)
+        writer.writerows([row.get(field, '') for field in fieldnames] for row in data)
     
     print(f"Data saved to: {output_file}")
     print(f"Total components written: {len(data)}")
@@ -1281,50 +1370,83 @@ if __name__ == "__main__":
     all_components = []
     all_branches = []
     all_branch_positions = []
-    all_component_pairs = []
     
-    # Process each TXT file
-    for txt_file in txt_files:
-        print(f"Reading TXT file: {txt_file}")
+    # Parse the Excel component data once for all TXT files
+    welded_components = load_welded_components(excel_file)
+    
+    # Component pairs are streamed to their CSV as the results of each file arrive, only their counts are kept
+    adjacency_fieldnames = ['KKS_Pipe', 'Branch', 
+                            'Component_1_Name', 'Component_1_Type', 'Component_1_PBOR', 'Component_1_Length',
+                            'Component_1_X', 'Component_1_Y', 'Component_1_Z',
+                            'Component_2_Name', 'Component_2_Type', 'Component_2_PBOR', 'Component_2_Length',
+                            'Component_2_X', 'Component_2_Y', 'Component_2_Z',
+                            'Distance_mm', 'Expected_Distance_mm', 'Threshold_Touching', 'Threshold_Near', 'Relationship']
+    adjacency_row = itemgetter(*adjacency_fieldnames)
+    component_pair_count = 0
+    relationship_counts = np.zeros(len(Relationship), dtype=np.intp)
+    touching_count_filtered = 0
+    
+    # Process the TXT files in parallel (one worker process per file, at most one per CPU)
+    # All extractions of a file share one parse, so the file is the unit of work
+    existing_txt_files = [txt_file for txt_file in txt_files if txt_file.exists()]
+    max_workers = max(1, min(len(existing_txt_files), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {txt_file: executor.submit(process_txt_file, txt_file, welded_components)
+                   for txt_file in existing_txt_files}
         
-        if not txt_file.exists():
-            print(f"  Warning: File not found, skipping...")
-            continue
-        
-        # Extract components from branches
-        components = extract_components_from_branches(txt_file)
-        print(f"  Extracted {len(components)} components")
-        all_components.extend(components)
-        
-        # Extract branch connection information
-        branches = extract_branch_connections(txt_file)
-        print(f"  Extracted {len(branches)} branch connections")
-        all_branches.extend(branches)
+        # Collect results in file order, streaming the component pairs of each file to the adjacency CSV
+        with open(output_adjacency_csv, 'w', newline='', encoding='utf-8') as adjacency_csvfile:
+            adjacency_writer = csv.writer(adjacency_csvfile)
+            adjacency_writer.writerow(adjacency_fieldnames)
+            
+            for txt_file in txt_files:
+                print(f"Reading TXT file: {txt_file}")
+                
+                if txt_file not in futures:
+                    print(f"  Warning: File not found, skipping...")
+                    continue
+                
+                components, branches, branch_positions, component_pairs = futures[txt_file].result()
+                print(f"  Extracted {len(components)} components")
+                all_components.extend(components)
+                print(f"  Extracted {len(branches)} branch connections")
+                all_branches.extend(branches)
+                print(f"  Extracted {len(branch_positions)} branch positions")
+                all_branch_positions.extend(branch_positions)
+                print(f"  Extracted {len(component_pairs)} component pairs")
+                adjacency_writer.writerows(map(adjacency_row, component_pairs))
+                component_pair_count += len(component_pairs)
+                
+                file_relationship_counts, file_touching_count_filtered = count_component_relationships(component_pairs)
+                relationship_counts += file_relationship_counts
+                touching_count_filtered += file_touching_count_filtered
         
-        # Extract branch positions
-        branch_positions = extract_branch_positions(txt_file)
-        print(f"  Extracted {len(branch_positions)} branch positions")
-        all_branch_positions.extend(branch_positions)
+        print(f"\nTotal components from all files: {len(all_components)}")
+        print(f"Total branches from all files: {len(all_branches)}")
+        print(f"Total branch positions: {len(all_branch_positions)}")
+        print(f"Total component pairs: {component_pair_count}")
         
-        # Extract component adjacency (touching components) - only welded components
-        component_pairs = extract_component_adjacency(txt_file, excel_file, distance_threshold_close=50.0, distance_threshold_near=150.0)
-        print(f"  Extracted {len(component_pairs)} component pairs")
-        all_component_pairs.extend(component_pairs)
-    
-    print(f"\nTotal components from all files: {len(all_components)}")
-    print(f"Total branches from all files: {len(all_branches)}")
-    print(f"Total branch positions: {len(all_branch_positions)}")
-    print(f"Total component pairs: {len(all_component_pairs)}")
-    
-    # Detect components at branch ends
-    print(f"\nDetecting components at branch ends...")
-    all_components_at_ends = []
-    for txt_file in txt_files:
-        result = detect_components_at_branch_ends(txt_file, excel_file, all_branch_positions, tolerance=100.0)
-        all_components_at_ends.extend(result['components_at_ends'])
-    
-    # Get combined stats
-    end_detection_stats = detect_components_at_branch_ends(txt_files[0], excel_file, all_branch_positions, tolerance=100.0)['stats']
+        # Detect components at branch ends (needs the branch positions of all files,
+        # the files are checked in parallel in the same worker processes)
+        print(f"\nDetecting components at branch ends...")
+        end_detections = [executor.submit(detect_components_at_branch_ends, txt_file, excel_file, all_branch_positions,
+                                          tolerance=100.0, welded_components=welded_components)
+                          for txt_file in txt_files]
+        all_components_at_ends = []
+        end_detection_stats = {}
+        # BWD totals are computed from all_branch_positions and are identical for every file,
+        # only the component counts are per file and need to be summed
+        project_totals = ('total_hcon_bwd', 'total_tcon_bwd', 'total_bwd_connections')
+        for end_detection in end_detections:
+            result = end_detection.result()
+            all_components_at_ends.extend(result['components_at_ends'])
+            
+            # Combine stats of all files
+            for key, value in result['stats'].items():
+                if key in project_totals:
+                    end_detection_stats[key] = value
+                else:
+                    end_detection_stats[key] = end_detection_stats.get(key, 0) + value
     
     # Find connected branches based on coordinates
     print(f"\nFinding connected branches based on coordinates...")
@@ -1332,222 +1454,141 @@ if __name__ == "__main__":
     print(f"Found {len(connected_branches)} branch connections")
     
     # Count match types
-    xy_count = sum(1 for c in connected_branches if c['Match_Type'] == 'XY_tight_Z_loose')
-    xz_count = sum(1 for c in connected_branches if c['Match_Type'] == 'XZ_tight_Y_loose')
-    yz_count = sum(1 for c in connected_branches if c['Match_Type'] == 'YZ_tight_X_loose')
+    match_type_counts = Counter(c['Match_Type'] for c in connected_branches)
+    xy_count = match_type_counts['XY_tight_Z_loose']
+    xz_count = match_type_counts['XZ_tight_Y_loose']
+    yz_count = match_type_counts['YZ_tight_X_loose']
     print(f"  - XY tight (<=5mm), Z loose (<=150mm): {xy_count}")
     print(f"  - XZ tight (<=5mm), Y loose (<=150mm): {xz_count}")
     print(f"  - YZ tight (<=5mm), X loose (<=150mm): {yz_count}")
     
-    # Save connected branches to CSV FIRST (before Excel read which might fail)
-    print(f"\nSaving connected branches to: {output_branch_coord_csv}")
-    with open(output_branch_coord_csv, 'w', newline='', encoding='utf-8') as csvfile:
+    # CSV files are written in background threads while the main thread carries on
+    # (each write is reported once it has finished)
+    csv_writes = []
+    with ThreadPoolExecutor(max_workers=4) as csv_writer:
+        # Save connected branches to CSV (written while the components are merged with the Excel data)
+        print(f"\nSaving connected branches to: {output_branch_coord_csv}")
         fieldnames = ['Branch_A', 'Branch_A_TCON', 'Branch_B', 'Branch_B_HCON',
-                     'Branch_A_Pipe', 'Branch_A_Branch',
-                     'Branch_B_Pipe', 'Branch_B_Branch', 
-                     'Connection_X', 'Connection_Y', 'Connection_Z', 
-                     'Distance_mm', 'Offset_X_mm', 'Offset_Y_mm', 'Offset_Z_mm', 
-                     'Max_Tight_Offset_mm', 'Loose_Offset_mm', 'Accuracy_Percent', 'Match_Type']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in connected_branches:
-            writer.writerow(row)
-    print(f"Connected branches written: {len(connected_branches)}")
-    
-    print(f"\nReading Excel file: {excel_file}")
-    
-    # Lookup and merge with Excel data
-    result = lookup_and_merge_with_excel(all_components, excel_file)
-    
-    # Save components to CSV
-    save_to_csv(result, output_csv)
-    
-    # Save branches to CSV
-    print(f"\nSaving branch connections to: {output_branches_csv}")
-    with open(output_branches_csv, 'w', newline='', encoding='utf-8') as csvfile:
+                      'Branch_A_Pipe', 'Branch_A_Branch',
+                      'Branch_B_Pipe', 'Branch_B_Branch', 
+                      'Connection_X', 'Connection_Y', 'Connection_Z', 
+                      'Distance_mm', 'Offset_X_mm', 'Offset_Y_mm', 'Offset_Z_mm', 
+                      'Max_Tight_Offset_mm', 'Loose_Offset_mm', 'Accuracy_Percent', 'Match_Type']
+        csv_writes.append((csv_writer.submit(write_csv, output_branch_coord_csv, fieldnames, connected_branches),
+                           f"Connected branches written: {len(connected_branches)}"))
+        
+        print(f"\nReading Excel file: {excel_file}")
+        
+        # Lookup and merge with Excel data
+        result = lookup_and_merge_with_excel(all_components, excel_file)
+        
+        # Save components to CSV
+        save_to_csv(result, output_csv)
+        
+        # Save branches to CSV
+        print(f"\nSaving branch connections to: {output_branches_csv}")
         fieldnames = ['Pipe', 'Branch', 'HCON', 'TCON', 'HSTU', 'First_Component', 'Last_Component', 'Head_Pipe_Length_mm', 'Tail_Pipe_Length_mm']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        for row in all_branches:
-            writer.writerow(row)
-    print(f"Branch connections written: {len(all_branches)}")
-    
-    # Save components at branch ends to CSV
-    output_ends_csv = Path(__file__).parent / "TBY" / 'components_at_branch_ends.csv'
-    print(f"\nSaving components at branch ends to: {output_ends_csv}")
-    with open(output_ends_csv, 'w', newline='', encoding='utf-8') as csvfile:
+        csv_writes.append((csv_writer.submit(write_csv, output_branches_csv, fieldnames, all_branches),
+                           f"Branch connections written: {len(all_branches)}"))
+        
+        # Save components at branch ends to CSV
+        output_ends_csv = Path(__file__).parent / "TBY" / 'components_at_branch_ends.csv'
+        print(f"\nSaving components at branch ends to: {output_ends_csv}")
         fieldnames = ['KKS_Pipe', 'Branch', 'Full_Branch_ID', 'Component_Name', 'Component_Type', 
-                     'Component_Length', 'Position', 'HCON', 'TCON',
-                     'Component_X', 'Component_Y', 'Component_Z',
-                     'Branch_End_X', 'Branch_End_Y', 'Branch_End_Z',
-                     'Distance_mm', 'Threshold_mm']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        for row in all_components_at_ends:
-            writer.writerow(row)
-    print(f"Components at branch ends written: {len(all_components_at_ends)}")
-    
-    # Create BWD connections report
-    output_bwd_report_csv = Path(__file__).parent / "TBY" / 'bwd_connections_report.csv'
-    print(f"\nGenerating BWD connections report...")
-    
-    # Create a lookup for components at branch ends
-    components_at_head_lookup = {}  # branch_id -> list of components
-    components_at_tail_lookup = {}  # branch_id -> list of components
-    
-    for comp in all_components_at_ends:
-        branch_id = comp['Full_Branch_ID']
-        if comp['Position'] == 'HEAD':
-            if branch_id not in components_at_head_lookup:
-                components_at_head_lookup[branch_id] = []
-            components_at_head_lookup[branch_id].append({
-                'name': comp['Component_Name'],
-                'type': comp['Component_Type'],
-                'distance': comp['Distance_mm']
-            })
-        elif comp['Position'] == 'TAIL':
-            if branch_id not in components_at_tail_lookup:
-                components_at_tail_lookup[branch_id] = []
-            components_at_tail_lookup[branch_id].append({
-                'name': comp['Component_Name'],
-                'type': comp['Component_Type'],
-                'distance': comp['Distance_mm']
-            })
-    
-    # Build BWD connection report
-    bwd_connections_report = []
-    
-    for branch in all_branch_positions:
-        branch_id = branch['Full_Branch_ID']
-        pipe = branch['Pipe']
-        branch_name = branch['Branch']
-        hcon = branch['HCON']
-        tcon = branch['TCON']
+                      'Component_Length', 'Position', 'HCON', 'TCON',
+                      'Component_X', 'Component_Y', 'Component_Z',
+                      'Branch_End_X', 'Branch_End_Y', 'Branch_End_Z',
+                      'Distance_mm', 'Threshold_mm']
+        csv_writes.append((csv_writer.submit(write_csv, output_ends_csv, fieldnames, all_components_at_ends),
+                           f"Components at branch ends written: {len(all_components_at_ends)}"))
         
-        # Check if HCON is BWD
-        if hcon == 'BWD':
-            head_components = components_at_head_lookup.get(branch_id, [])
-            if head_components:
-                # Sort by distance and get closest
-                head_components.sort(key=lambda x: x['distance'])
-                closest = head_components[0]
-                has_component = 'Yes'
-                component_name = closest['name']
-                component_type = closest['type']
-                component_distance = closest['distance']
-            else:
-                has_component = 'No'
-                component_name = ''
-                component_type = ''
-                component_distance = None
-            
-            bwd_connections_report.append({
-                'KKS_Pipe': pipe,
-                'Branch': branch_name,
-                'Full_Branch_ID': branch_id,
-                'End_Type': 'HEAD',
-                'Connection_Type': hcon,
-                'Has_Component_At_End': has_component,
-                'Component_Name': component_name,
-                'Component_Type': component_type,
-                'Distance_To_End_mm': component_distance
-            })
+        # Create BWD connections report
+        output_bwd_report_csv = Path(__file__).parent / "TBY" / 'bwd_connections_report.csv'
+        print(f"\nGenerating BWD connections report...")
         
-        # Check if TCON is BWD
-        if tcon == 'BWD':
-            tail_components = components_at_tail_lookup.get(branch_id, [])
-            if tail_components:
-                # Sort by distance and get closest
-                tail_components.sort(key=lambda x: x['distance'])
-                closest = tail_components[0]
-                has_component = 'Yes'
-                component_name = closest['name']
-                component_type = closest['type']
-                component_distance = closest['distance']
+        # Keep only the closest component per branch end (first one wins on equal distance)
+        closest_at_head = {}  # branch_id -> closest component at head
+        closest_at_tail = {}  # branch_id -> closest component at tail
+        
+        for comp in all_components_at_ends:
+            position = comp['Position']
+            if position == 'HEAD':
+                closest_lookup = closest_at_head
+            elif position == 'TAIL':
+                closest_lookup = closest_at_tail
             else:
-                has_component = 'No'
-                component_name = ''
-                component_type = ''
-                component_distance = None
+                continue
             
-            bwd_connections_report.append({
-                'KKS_Pipe': pipe,
-                'Branch': branch_name,
-                'Full_Branch_ID': branch_id,
-                'End_Type': 'TAIL',
-                'Connection_Type': tcon,
-                'Has_Component_At_End': has_component,
-                'Component_Name': component_name,
-                'Component_Type': component_type,
-                'Distance_To_End_mm': component_distance
-            })
-    
-    # Save BWD connections report to CSV
-    print(f"Saving BWD connections report to: {output_bwd_report_csv}")
-    with open(output_bwd_report_csv, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['KKS_Pipe', 'Branch', 'Full_Branch_ID', 'End_Type', 'Connection_Type',
-                     'Has_Component_At_End', 'Component_Name', 'Component_Type', 'Distance_To_End_mm']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in bwd_connections_report:
-            writer.writerow(row)
-    print(f"BWD connections report written: {len(bwd_connections_report)} entries")
-    
-    # Count summary for BWD report
-    bwd_with_component = sum(1 for r in bwd_connections_report if r['Has_Component_At_End'] == 'Yes')
-    bwd_without_component = sum(1 for r in bwd_connections_report if r['Has_Component_At_End'] == 'No')
-    print(f"  - BWD connections WITH component at end: {bwd_with_component}")
-    print(f"  - BWD connections WITHOUT component at end: {bwd_without_component}")
-    
-    # Save component adjacency to CSV
-    print(f"\nSaving component adjacency to: {output_adjacency_csv}")
-    with open(output_adjacency_csv, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['KKS_Pipe', 'Branch', 
-                     'Component_1_Name', 'Component_1_Type', 'Component_1_PBOR', 'Component_1_Length',
-                     'Component_1_X', 'Component_1_Y', 'Component_1_Z',
-                     'Component_2_Name', 'Component_2_Type', 'Component_2_PBOR', 'Component_2_Length',
-                     'Component_2_X', 'Component_2_Y', 'Component_2_Z',
-                     'Distance_mm', 'Expected_Distance_mm', 'Threshold_Touching', 'Threshold_Near', 'Relationship']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in all_component_pairs:
-            writer.writerow(row)
-    print(f"Component pairs written: {len(all_component_pairs)}")
-    
-    # Count relationships
-    touching_count_all = sum(1 for p in all_component_pairs if p['Relationship'] == 'Touching')
-    near_count = sum(1 for p in all_component_pairs if p['Relationship'] == 'Near')
-    separated_count = sum(1 for p in all_component_pairs if p['Relationship'] == 'Separated')
-    
-    # Filter touching pairs: exclude OLETs and FLANGE-FLANGE pairs
-    touching_count_filtered = sum(1 for p in all_component_pairs 
-                                  if p['Relationship'] == 'Touching'
-                                  and p['Component_1_Type'] != 'OLET' 
-                                  and p['Component_2_Type'] != 'OLET'
-                                  and not (p['Component_1_Type'] == 'FLANGE' and p['Component_2_Type'] == 'FLANGE'))
-    
-    print(f"  - Touching (PBOR-based threshold): {touching_count_all}")
-    print(f"    * Excluding OLETs and FLANGE-FLANGE pairs: {touching_count_filtered}")
-    print(f"  - Near (PBOR-based threshold): {near_count}")
-    print(f"  - Separated (>threshold): {separated_count}")
-    
-    # Display summary statistics
-    found_count = sum(1 for r in result if r['Found'] == 'X')
-    welded_count = sum(1 for r in result if r['Welded'] == 'X')
-    total_welds = sum(r['Weld_Count'] for r in result)
-    
-    # Count BWD branch ends with and without components
-    total_bwd_branch_ends = end_detection_stats['total_bwd_connections']
-    components_at_bwd_ends = end_detection_stats['components_at_head_bwd'] + end_detection_stats['components_at_tail_bwd']
-    
-    # Calculate final weld count
-    # Start with component welds
-    # Add BWD branch ends (each BWD connection needs a weld)
-    #   Note: connected_branches are already included in BWD branch ends count, so we don't add them separately
-    # Subtract touching component pairs (already counted in component welds)
-    # Subtract components at BWD ends (already counted in component welds)
-    # Exclude OLETs and FLANGE-FLANGE pairs from touching count
-    final_weld_count = total_welds + total_bwd_branch_ends - touching_count_filtered - components_at_bwd_ends
+            branch_id = comp['Full_Branch_ID']
+            closest = closest_lookup.get(branch_id)
+            if closest is None or comp['Distance_mm'] < closest['distance']:
+                closest_lookup[branch_id] = {
+                    'name': comp['Component_Name'],
+                    'type': comp['Component_Type'],
+                    'distance': comp['Distance_mm']
+                }
+        
+        # Stream the BWD connection report rows into the CSV and count them on the fly
+        print(f"Saving BWD connections report to: {output_bwd_report_csv}")
+        has_component_counts = Counter()
+        with open(output_bwd_report_csv, 'w', newline='', encoding='utf-8') as csvfile:
+            fieldnames = ['KKS_Pipe', 'Branch', 'Full_Branch_ID', 'End_Type', 'Connection_Type',
+                         'Has_Component_At_End', 'Component_Name', 'Component_Type', 'Distance_To_End_mm']
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            for row in iter_bwd_connections(all_branch_positions, closest_at_head, closest_at_tail):
+                writer.writerow(row)
+                has_component_counts[row[5]] += 1
+        print(f"BWD connections report written: {sum(has_component_counts.values())} entries")
+        
+        # Count summary for BWD report
+        bwd_with_component = has_component_counts['Yes']
+        bwd_without_component = has_component_counts['No']
+        print(f"  - BWD connections WITH component at end: {bwd_with_component}")
+        print(f"  - BWD connections WITHOUT component at end: {bwd_without_component}")
+        
+        # Component adjacency CSV (rows already written per file)
+        print(f"\nComponent adjacency saved to: {output_adjacency_csv}")
+        print(f"Component pairs written: {component_pair_count}")
+        
+        # Relationship counts of all files
+        touching_count_all = int(relationship_counts[Relationship.TOUCHING])
+        near_count = int(relationship_counts[Relationship.NEAR])
+        separated_count = int(relationship_counts[Relationship.SEPARATED])
+        
+        print(f"  - Touching (PBOR-based threshold): {touching_count_all}")
+        print(f"    * Excluding OLETs and FLANGE-FLANGE pairs: {touching_count_filtered}")
+        print(f"  - Near (PBOR-based threshold): {near_count}")
+        print(f"  - Separated (>threshold): {separated_count}")
+        
+        # Display summary statistics
+        found_count = 0
+        welded_count = 0
+        total_welds = 0
+        for r in result:
+            if r['Found'] == 'X':
+                found_count += 1
+            if r['Welded'] == 'X':
+                welded_count += 1
+            total_welds += r['Weld_Count']
+        
+        # Count BWD branch ends with and without components
+        total_bwd_branch_ends = end_detection_stats['total_bwd_connections']
+        components_at_bwd_ends = end_detection_stats['components_at_head_bwd'] + end_detection_stats['components_at_tail_bwd']
+        
+        # Calculate final weld count
+        # Start with component welds
+        # Add BWD branch ends (each BWD connection needs a weld)
+        #   Note: connected_branches are already included in BWD branch ends count, so we don't add them separately
+        # Subtract touching component pairs (already counted in component welds)
+        # Subtract components at BWD ends (already counted in component welds)
+        # Exclude OLETs and FLANGE-FLANGE pairs from touching count
+        final_weld_count = total_welds + total_bwd_branch_ends - touching_count_filtered - components_at_bwd_ends
+        
+        # Wait for all CSV files to be written (re-raises any write error)
+        for future, written_message in csv_writes:
+            future.result()
+            print(written_message)
     
     print(f"\nSummary:")
     print(f"Total components: {len(result)}")
@@ -13,9 +13,11 @@ Input file must contain 'old' and 'new' sheets with piping data.
 """
 
 import pandas as pd
+from pandas.io.parsers import TextParser
 import numpy as np
 from openpyxl import load_workbook, Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, Protection
+from openpyxl.cell.cell import Cell, TYPE_ERROR, TYPE_NUMERIC
 from openpyxl.comments import Comment
 from openpyxl.utils import get_column_letter
 from copy import copy
@@ -40,13 +42,30 @@ class Colors:
     DARK_RED = "FF0000"  # RGB(255, 0, 0) - Dark red for duplicate font color
 
 
+# Background colors of the data cells, stored by code in ComparisonResult.colors (code 0 = no color)
+CELL_COLORS = ("", Colors.LIGHT_BLUE, Colors.GREEN, Colors.YELLOW, Colors.RED)
+CELL_COLOR_CODES = {color: code for code, color in enumerate(CELL_COLORS)}
+
+# Cell change types as bit flags, so the changes of a row combine with a bitwise OR (0 = no change)
+CHANGE_DELETED = 1
+CHANGE_CHANGED = 2
+CHANGE_ADDED = 4
+CHANGE_NAMES = {CHANGE_DELETED: "Deleted", CHANGE_CHANGED: "Changed", CHANGE_ADDED: "Added"}
+
+# Background color code for each change flag (VBA: "D" red, "Ch" yellow, "N" green)
+CHANGE_COLOR_CODES = np.zeros(CHANGE_ADDED + 1, dtype=np.uint8)
+CHANGE_COLOR_CODES[CHANGE_DELETED] = CELL_COLOR_CODES[Colors.RED]
+CHANGE_COLOR_CODES[CHANGE_CHANGED] = CELL_COLOR_CODES[Colors.YELLOW]
+CHANGE_COLOR_CODES[CHANGE_ADDED] = CELL_COLOR_CODES[Colors.GREEN]
+
+
 @dataclass
 class ComparisonResult:
     """Stores comparison results with formatting information."""
     data: pd.DataFrame
     is_old_base: bool
-    colors: Dict[Tuple[int, str], str] = field(default_factory=dict)
-    comments: Dict[Tuple[int, str], str] = field(default_factory=dict)
+    colors: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.uint8))  # rows x columns color codes
+    comments: List[Tuple[int, int, str]] = field(default_factory=list)  # (row_idx, col_idx, text)
     markers: Dict[int, str] = field(default_factory=dict)
     duplicate_rows: set = field(default_factory=set)
     added_rows: List[Dict[str, Any]] = field(default_factory=list)
@@ -95,6 +114,10 @@ class ExcelTableComparator:
         self.old_data: Optional[pd.DataFrame] = None
         self.new_data: Optional[pd.DataFrame] = None
         self.column_names: List[str] = []
+        self.column_letters: List[str] = []  # Excel column letter of each column name
+        
+        # Solid background fills by color, shared by all cells of that color
+        self._fills: Dict[str, PatternFill] = {}
         
     def _detect_german_locale(self) -> bool:
         """Detect if system is German (matches VBA LanguageID intent)."""
@@ -108,6 +131,13 @@ class ExcelTableComparator:
         """Return localized text based on system language."""
         return german if self.is_german else english
     
+    def _get_fill(self, color: str) -> PatternFill:
+        """Return the shared solid fill for a color (created on first use)."""
+        fill = self._fills.get(color)
+        if fill is None:
+            fill = self._fills[color] = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        return fill
+    
     def _ensure_interface_no_as_string(self) -> None:
         """
         Ensure Interface No. values are properly formatted as strings.
@@ -145,23 +175,18 @@ class ExcelTableComparator:
         """Load and validate Excel files."""
         self.logger.info("Validating files and loading data...")
         
-        # Load workbooks
+        # Load workbooks (each file is parsed once: the OLD workbook is kept in full for the
+        # formatting capture, the NEW workbook is only needed for its values)
         self.old_workbook = load_workbook(self.old_file, data_only=True)
-        self.new_workbook = load_workbook(self.new_file, data_only=True)
+        self.new_workbook = load_workbook(self.new_file, read_only=True, data_only=True)
         
         # Load data from first sheet of each workbook
         old_sheet_name = self.old_workbook.sheetnames[0]
         new_sheet_name = self.new_workbook.sheetnames[0]
         
-        # Read Excel data with 'Interface No.' column as string to preserve leading zeros
-        # Use dtype to ensure Interface No. is read as string
-        try:
-            self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name, dtype={'Interface No.': str})
-            self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name, dtype={'Interface No.': str})
-        except (KeyError, ValueError):
-            # Fallback: read normally and then convert Interface No. column
-            self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name)
-            self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name)
+        self.old_data = self._read_sheet_data(self.old_workbook[old_sheet_name])
+        self.new_data = self._read_sheet_data(self.new_workbook[new_sheet_name])
+        self.new_workbook.close()
         
         # Ensure Interface No. values are properly formatted as strings (preserve leading zeros)
         self._ensure_interface_no_as_string()
@@ -179,26 +204,64 @@ class ExcelTableComparator:
         
         # Get column names (assuming both tables have same structure)
         self.column_names = list(self.new_data.columns)
+        self.column_letters = [get_column_letter(col_idx) for col_idx in range(1, len(self.column_names) + 1)]
         
         self.logger.info(f"Old table: {len(self.old_data)} rows, {len(self.old_data.columns)} columns")
         self.logger.info(f"New table: {len(self.new_data)} rows, {len(self.new_data.columns)} columns")
     
+    def _read_sheet_data(self, worksheet) -> pd.DataFrame:
+        """
+        Read worksheet values into a DataFrame with the first row as header, the same way
+        pd.read_excel does: the cells are converted like pandas' openpyxl
+        reader and parsed by pandas' TextParser (header naming, NA values, type inference).
+        """
+        if hasattr(worksheet, 'reset_dimensions'):
+            # Read-only sheets may report stale dimensions
+            worksheet.reset_dimensions()
+        
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(worksheet.iter_rows()):
+            values = []
+            for cell in row:
+                if cell.value is None:
+                    values.append('')
+                elif cell.data_type == TYPE_ERROR:
+                    values.append(np.nan)
+                elif cell.data_type == TYPE_NUMERIC:
+                    int_value = int(cell.value)
+                    values.append(int_value if int_value == cell.value else float(cell.value))
+                else:
+                    values.append(cell.value)
+            # Trim trailing empty cells
+            while values and values[-1] == '':
+                values.pop()
+            if values:
+                last_row_with_data = row_number
+            data.append(values)
+        
+        # Keep empty rows inside the table: _remove_added_deleted_rows_sections cuts off the
+        # sections of a previous comparison at the first empty Interface No.
+        data = data[:last_row_with_data + 1]
+        if not data:
+            return pd.DataFrame()
+        
+        width = max(len(values) for values in data)
+        data = [values + [''] * (width - len(values)) for values in data]
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    
     def _remove_comparison_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Remove the 'Changed' column and any 'Unnamed' columns that are artifacts 
         from previous comparisons.
         """
-        columns_to_drop = []
-        
-        # Check for "Changed" or "Geändert" column
-        for col in df.columns:
-            col_str = str(col)
-            if col_str in ['Changed', 'Geändert'] or col_str.startswith('Unnamed:'):
-                columns_to_drop.append(col)
+        # Check for "Changed" or "Geändert" column and "Unnamed" columns in one mask over the names
+        col_names = df.columns.astype(str)
+        drop_mask = col_names.isin(['Changed', 'Geändert']) | col_names.str.startswith('Unnamed:')
         
-        if columns_to_drop:
-            self.logger.info(f"Removing comparison columns: {columns_to_drop}")
-            df = df.drop(columns=columns_to_drop)
+        if drop_mask.any():
+            self.logger.info(f"Removing comparison columns: {list(df.columns[drop_mask])}")
+            df = df.loc[:, ~drop_mask]
         
         return df
     
@@ -215,16 +278,13 @@ class ExcelTableComparator:
             self.logger.warning("'Interface No.' column not found - skipping cleanup")
             return df
         
-        # Find the first row index where 'Interface No.' is empty
-        first_empty_idx = None
-        for idx in range(len(df)):
-            interface_no = df.iloc[idx]['Interface No.']
-            if pd.isna(interface_no) or str(interface_no).strip() == '':
-                first_empty_idx = idx
-                break
+        # Find the first row position where 'Interface No.' is empty
+        interface_no = df['Interface No.']
+        empty_mask = (interface_no.isna() | (interface_no.astype(str).str.strip() == '')).to_numpy()
         
         # If we found an empty row, drop it and everything below
-        if first_empty_idx is not None:
+        if empty_mask.any():
+            first_empty_idx = int(empty_mask.argmax())
             rows_dropped = len(df) - first_empty_idx
             self.logger.info(f"Found first empty Interface No. at row {first_empty_idx}, dropping {rows_dropped} rows")
             df = df.iloc[:first_empty_idx].copy()
@@ -411,8 +471,7 @@ class ExcelTableComparator:
         }
         
         # Capture column widths
-        for col_idx, col_name in enumerate(self.column_names, start=1):
-            col_letter = get_column_letter(col_idx)
+        for col_idx, col_letter in enumerate(self.column_letters, start=1):
             if old_ws.column_dimensions[col_letter].width:
                 formatting['column_widths'][col_idx] = old_ws.column_dimensions[col_letter].width
         
@@ -422,6 +481,8 @@ class ExcelTableComparator:
                 formatting['row_heights'][row_idx] = old_ws.row_dimensions[row_idx].height
         
         # Capture cell formats from header row and first data row
+        # (copy() takes the plain style objects out of the old sheet's StyleProxy wrappers, which can
+        # not be assigned to cells of another workbook; the copies are then shared by all output cells)
         for row_idx in [1, 2, 3]:  # Header rows and first data row
             for col_idx in range(1, len(self.column_names) + 1):
                 cell = old_ws.cell(row=row_idx, column=col_idx)
@@ -443,12 +504,9 @@ class ExcelTableComparator:
             df = df.copy()
             df['_unique_key'] = df['Interface No.'].astype(str)
             
-            # OPTIMIZED: Use pandas value_counts() for O(n) duplicate detection
-            interface_counts = df['Interface No.'].value_counts()
-            duplicated_interfaces = set(interface_counts[interface_counts > 1].index)
-            
-            # Mark duplicate rows efficiently
-            df['_is_duplicate'] = df['Interface No.'].isin(duplicated_interfaces)
+            # OPTIMIZED: Single hashed pass marks every row whose Interface No. occurs more than once
+            # (Interface No. values are already strings, empty cells are "")
+            df['_is_duplicate'] = df['Interface No.'].duplicated(keep=False)
             
             return df
         
@@ -480,96 +538,88 @@ class ExcelTableComparator:
         )
         
         # Track duplicate rows for red font marking
-        for idx in range(len(base_df)):
-            if base_df.iloc[idx]['_is_duplicate']:
-                result.duplicate_rows.add(idx)
+        result.duplicate_rows.update(np.flatnonzero(base_df['_is_duplicate'].to_numpy()).tolist())
         
         # PERFORMANCE OPTIMIZATION: Create lookup dictionaries
-        # Create a mapping from unique_key to ALL row indices (to handle duplicates)
-        base_key_to_indices = defaultdict(list)
-        for idx, row in base_df.iterrows():
-            base_key_to_indices[row['_unique_key']].append(idx)
+        # Keys of both tables as shared integer codes (int hashing is cheaper than string hashing)
+        combined_keys = pd.Categorical(pd.concat([base_df['_unique_key'], compare_df['_unique_key']],
+                                                 ignore_index=True))
+        base_codes = combined_keys.codes[:len(base_df)]
+        compare_codes = combined_keys.codes[len(base_df):]
+        
+        # Create a mapping from key code to ALL row positions in table order (to handle duplicates)
+        base_key_to_indices = {int(code): positions.tolist() for code, positions
+                               in pd.Series(base_codes).groupby(base_codes, sort=False).indices.items()}
         
         # Set base background color for all cells (VBA: UsedRange.Interior.Color)
         base_color = Colors.LIGHT_BLUE if is_old_base else Colors.GREEN
-        for row_idx in range(len(result.data)):
-            for col_name in self.column_names:
-                result.colors[(row_idx, col_name)] = base_color
+        result.colors = np.full((len(result.data), len(self.column_names)), CELL_COLOR_CODES[base_color],
+                                dtype=np.uint8)
         
         # VECTORIZED COMPARISON: Process all rows at once where possible
-        compare_keys = compare_df['_unique_key'].tolist()
-        
-        # Find which keys exist in base (vectorized operation)
-        existing_keys = set(base_key_to_indices.keys())
+        # Find which compare rows have a key that exists in base (vectorized hash lookup on the key codes)
+        found_mask = np.isin(compare_codes, base_codes)
+        
+        # Rows not found in base table by key
+        # Only include columns that are in self.column_names (exclude metadata columns)
+        row_columns = [col for col in self.column_names if col in compare_df.columns]
+        not_found_rows = compare_df.loc[~found_mask, row_columns].to_dict('records')
+        if is_old_base:
+            # OLD is base, NEW row not found = Added to NEW
+            result.added_rows.extend(not_found_rows)
+        else:
+            # NEW is base, OLD row not found = Deleted from NEW
+            result.deleted_rows.extend(not_found_rows)
         
-        # Separate found and not found keys
         found_comparisons = []
-        used_compare_indices = set()  # Track which compare indices have been matched
+        # Base rows of a key are matched in order, so the first unused one is the next in its list
+        next_base_slot = defaultdict(int)
         
-        for compare_idx, compare_key in enumerate(compare_keys):
-            if compare_key in existing_keys:
-                # Get ALL indices for this key in base table
-                base_indices = base_key_to_indices[compare_key]
-                
-                # Match 1-to-1 in order: find first unused base index for this key
-                for base_idx in base_indices:
-                    # Check if this base_idx has already been matched to another compare row
-                    if not any(base_idx == b_idx for b_idx, _ in found_comparisons):
-                        found_comparisons.append((base_idx, compare_idx))
-                        used_compare_indices.add(compare_idx)
-                        break  # Only match once per compare row
-            else:
-                # Row not found in base table by key
-                # Only include columns that are in self.column_names (exclude metadata columns)
-                row_data = {col: compare_df.iloc[compare_idx][col] for col in self.column_names if col in compare_df.columns}
-                if is_old_base:
-                    # OLD is base, NEW row not found = Added to NEW
-                    result.added_rows.append(row_data)
-                else:
-                    # NEW is base, OLD row not found = Deleted from NEW
-                    result.deleted_rows.append(row_data)
-        
-        # Process found rows in batches for better performance
-        for base_idx, compare_idx in found_comparisons:
-            # Clear base color for this row (VBA: Interior.Pattern = xlNone)
-            for col_name in self.column_names:
-                if (base_idx, col_name) in result.colors:
-                    del result.colors[(base_idx, col_name)]
-            
-            # Compare individual cells (optimized)
-            changes_in_row = []
+        for compare_idx in np.flatnonzero(found_mask).tolist():
+            compare_key = int(compare_codes[compare_idx])
+            # Get ALL indices for this key in base table
+            base_indices = base_key_to_indices[compare_key]
             
-            # VECTORIZED: Get all values for this row at once
-            base_row = result.data.iloc[base_idx]
-            compare_row = compare_df.iloc[compare_idx]
-            
-            for col_name in self.column_names:
-                base_value = self._get_cell_text_value_fast(base_row[col_name])
-                compare_value = self._get_cell_text_value_fast(compare_row[col_name])
-                
-                if base_value == compare_value:
-                    continue  # No change
-                
-                # Determine change type and apply formatting
-                change_type, color = self._analyze_cell_change(
-                    base_value, compare_value, is_old_base
-                )
-                
-                result.colors[(base_idx, col_name)] = color
-                changes_in_row.append(change_type)
-                
-                # Add comment if value changed
-                if change_type in ["Changed", "Added", "Deleted"]:
-                    compare_table_name = "New Table" if is_old_base else "Old Table"
-                    # Show the old value in the comment
-                    if compare_value:
-                        result.comments[(base_idx, col_name)] = f"{compare_table_name} value:\n{compare_value}"
-                    else:
-                        result.comments[(base_idx, col_name)] = f"{compare_table_name} value:\n(empty)"
-            
-            # Combine change markers for this row
-            if changes_in_row:
-                result.markers[base_idx] = self._combine_change_markers(changes_in_row)
+            # Match 1-to-1 in order: take the first unused base index for this key (if any is left)
+            slot = next_base_slot[compare_key]
+            if slot < len(base_indices):
+                found_comparisons.append((base_indices[slot], compare_idx))
+                next_base_slot[compare_key] = slot + 1
+        
+        if not found_comparisons:
+            return result
+        
+        # Cell texts of all matched rows at once, in matching order (VBA compares the .Text values)
+        base_positions = [base_idx for base_idx, _ in found_comparisons]
+        compare_positions = [compare_idx for _, compare_idx in found_comparisons]
+        base_text = self._get_text_values(result.data.iloc[base_positions])
+        compare_text = self._get_text_values(compare_df.iloc[compare_positions][self.column_names])
+        
+        # Change type of every matched cell; the base color of the matched rows is replaced by the
+        # change colors, unchanged cells get no color (VBA: Interior.Pattern = xlNone)
+        change_flags = self._classify_cell_changes(base_text, compare_text, is_old_base)
+        result.colors[base_positions, :] = CHANGE_COLOR_CODES[change_flags]
+        
+        # Combine change markers for each changed row
+        row_flags = np.bitwise_or.reduce(change_flags, axis=1)
+        marker_texts = {}
+        for match_idx in np.flatnonzero(row_flags).tolist():
+            flags = int(row_flags[match_idx])
+            marker_text = marker_texts.get(flags)
+            if marker_text is None:
+                marker_text = marker_texts[flags] = self._combine_change_markers(
+                    [name for flag, name in CHANGE_NAMES.items() if flags & flag])
+            result.markers[base_positions[match_idx]] = marker_text
+        
+        # Add comment to every changed cell, showing the value of the compare table
+        compare_table_name = "New Table" if is_old_base else "Old Table"
+        for match_idx, col_pos in zip(*(positions.tolist() for positions in np.nonzero(change_flags))):
+            base_idx = base_positions[match_idx]
+            compare_value = compare_text[match_idx, col_pos]
+            if compare_value:
+                result.comments.append((base_idx, col_pos + 1, f"{compare_table_name} value:\n{compare_value}"))
+            else:
+                result.comments.append((base_idx, col_pos + 1, f"{compare_table_name} value:\n(empty)"))
         
         return result
     
@@ -580,28 +630,14 @@ class ExcelTableComparator:
         """
         self.logger.info("Post-processing: Checking for rows with all green cells...")
         
-        for row_idx in range(len(result.data)):
-            # Check if all cells in this row have green background
-            all_cells_green = True
-            cells_with_colors = 0
-            
-            for col_name in self.column_names:
-                color_key = (row_idx, col_name)
-                if color_key in result.colors:
-                    cells_with_colors += 1
-                    if result.colors[color_key] != Colors.GREEN:
-                        all_cells_green = False
-                        break
-                else:
-                    # If a cell has no color, it's not green
-                    all_cells_green = False
-                    break
-            
-            # If all cells in the row are green, mark the row as "Added"
-            if all_cells_green and cells_with_colors == len(self.column_names):
-                added_text = self._get_localized_text("Added", "Hinzugefügt")
-                result.markers[row_idx] = added_text
-                self.logger.debug(f"Row {row_idx}: All cells green -> marked as '{added_text}'")
+        # Rows where every cell has green background (a cell without color is not green)
+        green_rows = np.flatnonzero((result.colors == CELL_COLOR_CODES[Colors.GREEN]).all(axis=1))
+        
+        # Mark all of these rows as "Added"
+        added_text = self._get_localized_text("Added", "Hinzugefügt")
+        for row_idx in green_rows.tolist():
+            result.markers[row_idx] = added_text
+            self.logger.debug(f"Row {row_idx}: All cells green -> marked as '{added_text}'")
     
     def _get_cell_text_value_fast(self, value) -> str:
         """Fast cell value to text conversion (optimized version)."""
@@ -618,6 +654,38 @@ class ExcelTableComparator:
         
         return str(value)
     
+    def _column_to_text(self, column: pd.Series) -> List[str]:
+        """
+        Convert a column to cell texts, same result as _get_cell_text_value_fast() per value.
+        Numeric columns are converted with NumPy in one pass, other columns value by value.
+        """
+        kind = column.dtype.kind
+        if kind in 'iub':
+            return column.to_numpy().astype(str).tolist()
+        
+        if kind == 'f':
+            values = column.to_numpy()
+            text = np.full(len(values), "", dtype=object)  # NaN -> ""
+            # Whole numbers without .0 (values beyond the int64 range keep str(float))
+            whole = np.isfinite(values) & (np.mod(values, 1) == 0) & (np.abs(values) < 2.0 ** 63)
+            other = ~np.isnan(values) & ~whole
+            text[whole] = values[whole].astype(np.int64).astype(str).tolist()
+            text[other] = [str(value) for value in values[other].tolist()]
+            return text.tolist()
+        
+        return [self._get_cell_text_value_fast(value) for value in column.tolist()]
+    
+    def _get_text_values(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Convert all cells of a DataFrame to text, column by column (rows x columns object array).
+        
+        The columns are converted one after the other, not in a thread pool: text and mixed columns
+        are converted value by value in Python and hold the GIL, and the NumPy conversion of the
+        numeric columns is too short to gain from threads.
+        """
+        text_columns = [self._column_to_text(df.iloc[:, col_pos]) for col_pos in range(df.shape[1])]
+        return np.array(text_columns, dtype=object).reshape(df.shape[1], len(df)).T
+    
     def _get_cell_text_value(self, df: pd.DataFrame, row_idx: int, col_name: str) -> str:
         """Get cell value as text (matches VBA .Text property)."""
         value = df.iloc[row_idx][col_name]
@@ -634,35 +702,31 @@ class ExcelTableComparator:
         
         return str(value)
     
-    def _analyze_cell_change(self, base_value: str, compare_value: str, 
-                           is_old_base: bool) -> Tuple[str, str]:
+    def _classify_cell_changes(self, base_text: np.ndarray, compare_text: np.ndarray,
+                               is_old_base: bool) -> np.ndarray:
         """
-        Analyze cell change and return change type with color (matches VBA change logic).
+        Classify the change of every cell at once (matches VBA change logic), returning
+        CHANGE_* flags (0 = no change) with the shape of the text arrays.
         VBA logic depends on which table is the base!
         """
-        # Both empty - no change
-        if not base_value and not compare_value:
-            return "No Change", ""
-        
-        # Base cell is empty AND compare cell has value
-        if not base_value and compare_value:
-            if is_old_base:  # OLD is base, NEW has value = Added to NEW
-                return "Added", Colors.GREEN  # "N"
-            else:  # NEW is base, OLD has value = Deleted from NEW  
-                return "Deleted", Colors.RED  # "D"
-        
-        # Base cell has value AND compare cell is empty
-        if base_value and not compare_value:
-            if is_old_base:  # OLD is base, NEW empty = Deleted in NEW
-                return "Deleted", Colors.RED  # "D"
-            else:  # NEW is base, OLD empty = Added in NEW
-                return "Added", Colors.GREEN  # "N"
-        
-        # Both have different non-empty values = Changed
-        if base_value != compare_value:
-            return "Changed", Colors.YELLOW  # "Ch"
-        
-        return "No Change", ""
+        base_empty = base_text == ""
+        compare_empty = compare_text == ""
+        changed = base_text != compare_text
+        
+        change_flags = np.zeros(changed.shape, dtype=np.uint8)
+        
+        # Both have different non-empty values = Changed ("Ch")
+        change_flags[changed & ~base_empty & ~compare_empty] = CHANGE_CHANGED
+        
+        # Base cell is empty AND compare cell has value:
+        # OLD is base, NEW has value = Added to NEW ("N"); NEW is base, OLD has value = Deleted from NEW ("D")
+        change_flags[changed & base_empty] = CHANGE_ADDED if is_old_base else CHANGE_DELETED
+        
+        # Base cell has value AND compare cell is empty:
+        # OLD is base, NEW empty = Deleted in NEW ("D"); NEW is base, OLD empty = Added in NEW ("N")
+        change_flags[changed & compare_empty] = CHANGE_DELETED if is_old_base else CHANGE_ADDED
+        
+        return change_flags
     
     def _combine_change_markers(self, changes: List[str]) -> str:
         """Combine multiple change types into descriptive text."""
@@ -684,7 +748,13 @@ class ExcelTableComparator:
         return ", ".join(descriptions)
     
     def generate_excel_output(self, new_base_result: ComparisonResult) -> None:
-        """Generate Excel output file with comparison results."""
+        """
+        Generate Excel output file with comparison results.
+        
+        Uses a regular (not write-only) workbook: _write_comparison_sheet() is shared with
+        extract_sheets_and_compare(), which adds the sheet to the loaded compare workbook,
+        and it sets cells, comments and row heights out of row order.
+        """
         self.logger.info("Generating Excel output...")
         
         # Capture formatting from old sheet
@@ -743,14 +813,21 @@ class ExcelTableComparator:
         start_row = 3
         end_row = start_row + len(result.data) - 1
         
-        # Check each cell for wrap text and enable auto height if needed
-        for row_num in range(start_row, end_row + 1):
-            for col_idx in range(1, len(self.column_names) + 1):
-                cell = worksheet.cell(row=row_num, column=col_idx)
-                if cell.alignment and cell.alignment.wrap_text:
-                    # Enable auto height for this row
-                    worksheet.row_dimensions[row_num].height = None
-                    break  # Only need to set once per row
+        if end_row < start_row:
+            return
+        
+        # All data cells of a column get the same alignment (_write_data_rows), so the first
+        # data row tells whether the rows have wrap text; no need to check every cell
+        has_wrap_text = any(
+            cell.alignment and cell.alignment.wrap_text
+            for cell in (worksheet.cell(row=start_row, column=col_idx)
+                         for col_idx in range(1, len(self.column_names) + 1))
+        )
+        
+        # Enable auto height for the data rows
+        if has_wrap_text:
+            for row_num in range(start_row, end_row + 1):
+                worksheet.row_dimensions[row_num].height = None
     
     def _apply_column_formatting(self, worksheet, formatting: dict) -> None:
         """Apply column widths and auto-height for rows from old sheet."""
@@ -771,9 +848,9 @@ class ExcelTableComparator:
         worksheet.cell(1, 6, self._get_localized_text("Deleted", "Gelöscht"))
         
         # Apply background colors to match the change types
-        worksheet.cell(1, 4).fill = PatternFill(start_color=Colors.YELLOW, end_color=Colors.YELLOW, fill_type='solid')
-        worksheet.cell(1, 5).fill = PatternFill(start_color=Colors.GREEN, end_color=Colors.GREEN, fill_type='solid')
-        worksheet.cell(1, 6).fill = PatternFill(start_color=Colors.RED, end_color=Colors.RED, fill_type='solid')
+        worksheet.cell(1, 4).fill = self._get_fill(Colors.YELLOW)
+        worksheet.cell(1, 5).fill = self._get_fill(Colors.GREEN)
+        worksheet.cell(1, 6).fill = self._get_fill(Colors.RED)
     
     def _write_data_headers(self, worksheet, formatting: dict) -> None:
         """Write column headers in row 2 with formatting from old sheet."""
@@ -783,9 +860,9 @@ class ExcelTableComparator:
             # Apply formatting from old sheet header row (row 2)
             if (2, col_idx) in formatting.get('cell_formats', {}):
                 fmt = formatting['cell_formats'][(2, col_idx)]
-                cell.font = copy(fmt['font'])
-                cell.alignment = copy(fmt['alignment'])
-                cell.border = copy(fmt['border'])
+                cell.font = fmt['font']
+                cell.alignment = fmt['alignment']
+                cell.border = fmt['border']
                 cell.number_format = fmt['number_format']
             
             # Enable wrap text for header row
@@ -810,7 +887,7 @@ class ExcelTableComparator:
             )
             
             # Set specific column widths
-            col_letter = get_column_letter(col_idx)
+            col_letter = self.column_letters[col_idx - 1]
             if col_name == "PIPEN - Name":
                 worksheet.column_dimensions[col_letter].width = 20
             elif col_name == "PIPEN - comment":
@@ -819,13 +896,31 @@ class ExcelTableComparator:
                 worksheet.column_dimensions[col_letter].width = 20
     
     def _write_data_rows(self, worksheet, result: ComparisonResult, formatting: dict) -> None:
-        """Write data rows with colors, comments, and formatting from old sheet."""
+        """
+        Write data rows with colors, comments, and formatting from old sheet.
+        Each row is built as a list of cells and appended in one call, directly below the
+        header row 2 (row 3 onwards).
+        """
+        # All data cells of a column get the same template formatting, so the wrap text alignment
+        # and the duplicate font are built once from the first cell and reused for the others
+        wrap_alignments = {}
+        duplicate_font = None
+        
+        # Cell values as a plain array (avoids a pandas row lookup per cell)
+        values = result.data[self.column_names].to_numpy(dtype=object)
+        
+        # Template formatting of each column from old sheet data row (row 3), None if not captured
+        cell_formats = formatting.get('cell_formats', {})
+        column_formats = [cell_formats.get((3, col_idx)) for col_idx in range(1, len(self.column_names) + 1)]
+        
         for row_idx in range(len(result.data)):
             excel_row = row_idx + 3  # Start from row 3
+            row_cells = []
             
             for col_idx, col_name in enumerate(self.column_names, start=1):
-                cell = worksheet.cell(row=excel_row, column=col_idx)
-                cell_value = result.data.iloc[row_idx][col_name]
+                cell = Cell(worksheet)
+                row_cells.append(cell)
+                cell_value = values[row_idx, col_idx - 1]
                 
                 # Special handling for Interface No. to preserve leading zeros
                 if col_name == 'Interface No.' and pd.notna(cell_value):
@@ -837,48 +932,56 @@ class ExcelTableComparator:
                     cell.value = cell_value
                 
                 # Apply formatting from old sheet data row (row 3 as template)
-                if (3, col_idx) in formatting.get('cell_formats', {}):
-                    fmt = formatting['cell_formats'][(3, col_idx)]
-                    cell.font = copy(fmt['font'])
-                    cell.alignment = copy(fmt['alignment'])
-                    cell.border = copy(fmt['border'])
+                fmt = column_formats[col_idx - 1]
+                if fmt is not None:
+                    cell.font = fmt['font']
+                    cell.alignment = fmt['alignment']
+                    cell.border = fmt['border']
                     cell.number_format = fmt['number_format']
                 
                 # Enable wrap text for PIPEN - comment column
                 if col_name == "PIPEN - comment":
-                    existing_alignment = cell.alignment if cell.alignment else Alignment()
-                    cell.alignment = Alignment(
-                        horizontal=existing_alignment.horizontal,
-                        vertical=existing_alignment.vertical,
-                        text_rotation=existing_alignment.text_rotation,
-                        indent=existing_alignment.indent,
-                        shrink_to_fit=existing_alignment.shrink_to_fit,
-                        wrap_text=True
-                    )
+                    wrap_alignment = wrap_alignments.get(col_idx)
+                    if wrap_alignment is None:
+                        existing_alignment = cell.alignment if cell.alignment else Alignment()
+                        wrap_alignment = wrap_alignments[col_idx] = Alignment(
+                            horizontal=existing_alignment.horizontal,
+                            vertical=existing_alignment.vertical,
+                            text_rotation=existing_alignment.text_rotation,
+                            indent=existing_alignment.indent,
+                            shrink_to_fit=existing_alignment.shrink_to_fit,
+                            wrap_text=True
+                        )
+                    cell.alignment = wrap_alignment
                 
                 # Apply colors (this may override some formatting like fill)
-                if (row_idx, col_name) in result.colors:
-                    color = result.colors[(row_idx, col_name)]
-                    cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-                
-                # Apply comments
-                if (row_idx, col_name) in result.comments:
-                    cell.comment = Comment(result.comments[(row_idx, col_name)], "System")
-                    cell.comment.width = 200
-                    cell.comment.height = 50
+                color_code = result.colors[row_idx, col_idx - 1]
+                if color_code:
+                    cell.fill = self._get_fill(CELL_COLORS[color_code])
+            
+            worksheet.append(row_cells)
             
             # Mark duplicates with dark red font in Interface No. column
             # Preserve existing font attributes but change color to dark red
             if row_idx in result.duplicate_rows:
                 dup_cell = worksheet.cell(row=excel_row, column=2)
-                existing_font = dup_cell.font
-                dup_cell.font = Font(
-                    name=existing_font.name,
-                    size=existing_font.size,
-                    bold=existing_font.bold,
-                    italic=existing_font.italic,
-                    color=Colors.DARK_RED
-                )
+                if duplicate_font is None:
+                    existing_font = dup_cell.font
+                    duplicate_font = Font(
+                        name=existing_font.name,
+                        size=existing_font.size,
+                        bold=existing_font.bold,
+                        italic=existing_font.italic,
+                        color=Colors.DARK_RED
+                    )
+                dup_cell.font = duplicate_font
+        
+        # Apply comments (only the changed cells have one)
+        for row_idx, col_idx, comment_text in result.comments:
+            cell = worksheet.cell(row=row_idx + 3, column=col_idx)
+            cell.comment = Comment(comment_text, "System")
+            cell.comment.width = 200
+            cell.comment.height = 50
     
     def _write_added_rows_section(self, worksheet, result: ComparisonResult) -> None:
         """Write added rows section at the bottom."""
@@ -0,0 +1,94 @@
+"""
+Tests for loading the compared tables in Interface_list_excel_compare.py
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+# Add this directory to path to import the module
+sys.path.insert(0, str(Path(__file__).parent))
+
+from Interface_list_excel_compare import ExcelTableComparator
+
+
+def create_test_xlsx(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return wb
+
+
+@pytest.fixture
+def comparator(tmp_path, monkeypatch):
+    # The comparator writes comparison.log to the working directory
+    monkeypatch.chdir(tmp_path)
+    return ExcelTableComparator(tmp_path / "old.xlsx", tmp_path / "new.xlsx", tmp_path / "out.xlsx")
+
+
+def test_read_sheet_data_keeps_blank_rows_inside_table(comparator):
+    """Blank rows inside the table are kept as all-NaN rows, trailing blank rows are dropped"""
+    wb = create_test_xlsx(comparator.old_file, [
+        ["Interface No.", "Description"],
+        ["IF-001", "Pump"],
+        [None, None],
+        ["IF-002", "Valve"],
+        [None, None],
+        [None, None],
+    ])
+
+    df = comparator._read_sheet_data(wb.active)
+
+    assert list(df.columns) == ["Interface No.", "Description"]
+    assert len(df) == 3
+    assert df.iloc[1].isna().all()
+    assert df.iloc[2]["Interface No."] == "IF-002"
+
+
+@pytest.mark.parametrize("read_only", [False, True])
+def test_read_sheet_data_matches_read_excel(comparator, read_only):
+    """Values, header names and blank rows come out exactly as pd.read_excel reads them"""
+    create_test_xlsx(comparator.old_file, [
+        ["Interface No.", "Desc", None, "Desc", "Code"],
+        ["IF-001", "N/A", 1.5, "Pump", "0042"],
+        [None, None, None, None, None],
+        ["IF-002", "Valve", None, None, "0043"],
+        ["IF-003", None, 2.0, "NULL", "12"],
+        [None, None, None, None, None],
+    ])
+
+    wb = load_workbook(comparator.old_file, read_only=read_only)
+    df = comparator._read_sheet_data(wb.active)
+    wb.close()
+
+    pd.testing.assert_frame_equal(df, pd.read_excel(comparator.old_file))
+
+
+def test_previous_output_sections_are_removed(comparator):
+    """The Added/Deleted Rows sections of a previous comparison are cut off at the blank row"""
+    header = ["Interface No.", "Description"]
+    create_test_xlsx(comparator.old_file, [
+        header,
+        ["IF-001", "Pump"],
+        ["IF-002", "Valve"],
+    ])
+    create_test_xlsx(comparator.new_file, [
+        header,
+        ["IF-001", "Pump"],
+        ["IF-002", "Valve"],
+        [None, None],
+        [None, None],
+        ["Deleted Rows", None],
+        header,
+        ["IF-003", "Tank"],
+    ])
+
+    comparator.validate_files_and_load_data()
+
+    assert list(comparator.old_data["Interface No."]) == ["IF-001", "IF-002"]
+    assert list(comparator.new_data["Interface No."]) == ["IF-001", "IF-002"]
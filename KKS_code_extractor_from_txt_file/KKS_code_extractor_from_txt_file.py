@@ -12,6 +12,17 @@ import pandas as pd
 from pathlib import Path
 
 
+# Pattern for potential KKS code components
+# Part 1: digit [0-3] + optional space + 3 letters + 2 digits
+PART1_PATTERN = re.compile(r'\b([0-3])\s*([A-Z]{3})(\d{2})\b')
+# Part 2: 2 letters + 3 digits
+PART2_PATTERN = re.compile(r'\b([A-Z]{2})(\d{3})\b')
+# Complete KKS on single line (with possible spaces)
+COMPLETE_PATTERN = re.compile(r'\b([0-3])\s*([A-Z]{3})(\d{2})\s*([A-Z]{2})(\d{3})\b')
+# Exact KKS code
+VALID_KKS_PATTERN = re.compile(r'^[0-3][A-Z]{3}\d{2}[A-Z]{2}\d{3}$')
+
+
 def extract_kks_codes(file_path):
     """
     Extract KKS codes from text file handling multiple formatting patterns.
@@ -22,59 +33,36 @@ def extract_kks_codes(file_path):
     3. No spaces: "1HTF14BZ010"
     """
     
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
+    # Read the whole file in one call and strip every line once
+    # (each line is searched as the current line and as the next line of its predecessor)
+    text = Path(file_path).read_text(encoding='utf-8', errors='ignore')
+    lines = [line.strip() for line in text.split('\n')]
     
     kks_codes = set()  # Use set to automatically handle duplicates
     
-    # Pattern for potential KKS code components
-    # Part 1: digit [0-3] + optional space + 3 letters + 2 digits
-    part1_pattern = r'\b([0-3])\s*([A-Z]{3})(\d{2})\b'
-    # Part 2: 2 letters + 3 digits
-    part2_pattern = r'\b([A-Z]{2})(\d{3})\b'
-    # Complete KKS on single line (with possible spaces)
-    complete_pattern = r'\b([0-3])\s*([A-Z]{3})(\d{2})\s*([A-Z]{2})(\d{3})\b'
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
+    for i, line in enumerate(lines):
         # First, try to find complete KKS codes on the current line
-        complete_matches = re.finditer(complete_pattern, line)
-        for match in complete_matches:
+        # Part 1 prefixes (first 6 characters) of the complete codes on this line
+        complete_prefixes = set()
+        for match in COMPLETE_PATTERN.finditer(line):
             # Combine all groups without spaces
             kks_code = ''.join(match.groups())
             kks_codes.add(kks_code)
+            complete_prefixes.add(kks_code[:6])
         
         # Now look for split patterns (part1 on current line, part2 on next line)
-        part1_matches = list(re.finditer(part1_pattern, line))
+        # Part 1 texts not already matched as the start of a complete code on this line
+        part1_texts = [part1_text for part1_text in (''.join(match.groups()) for match in PART1_PATTERN.finditer(line))
+                       if part1_text not in complete_prefixes]
         
-        if part1_matches and i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            part2_matches = list(re.finditer(part2_pattern, next_line))
+        if part1_texts and i + 1 < len(lines):
+            # Look for corresponding part2 on the next line
+            part2_texts = [''.join(match.groups()) for match in PART2_PATTERN.finditer(lines[i + 1])]
             
-            # Try to match parts across lines
-            for p1_match in part1_matches:
-                part1_text = ''.join(p1_match.groups())
-                
-                # Check if this part1 was already matched as a complete code on this line
-                # by seeing if it's a substring of any complete match on this line
-                already_complete = False
-                for c_match in re.finditer(complete_pattern, line):
-                    complete_text = ''.join(c_match.groups())
-                    if complete_text.startswith(part1_text):
-                        already_complete = True
-                        break
-                
-                if not already_complete:
-                    # Look for corresponding part2 on the next line
-                    for p2_match in part2_matches:
-                        part2_text = ''.join(p2_match.groups())
-                        # Combine to form complete KKS code
-                        kks_code = part1_text + part2_text
-                        kks_codes.add(kks_code)
-        
-        i += 1
+            # Combine the parts across lines to form complete KKS codes
+            for part1_text in part1_texts:
+                for part2_text in part2_texts:
+                    kks_codes.add(part1_text + part2_text)
     
     return sorted(list(kks_codes))
 
@@ -84,8 +72,7 @@ def validate_kks_code(code):
     Validate that a code matches the exact KKS pattern.
     Returns True if valid.
     """
-    pattern = r'^[0-3][A-Z]{3}\d{2}[A-Z]{2}\d{3}$'
-    return bool(re.match(pattern, code))
+    return bool(VALID_KKS_PATTERN.match(code))
 
 
 def main():
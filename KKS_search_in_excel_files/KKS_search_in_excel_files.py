@@ -9,24 +9,44 @@ import re
 import argparse
 import csv
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import openpyxl
 from openpyxl.utils import range_boundaries
 
 
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+
+def _scan_excel_files(directory):
+    """Yield Excel files in the directory tree, files of a directory before its subdirectories (like os.walk)."""
+    try:
+        with os.scandir(directory) as entries:
+            entries = list(entries)
+    except OSError:
+        return  # os.walk skips unreadable directories too
+    
+    subdirectories = []
+    for entry in entries:
+        if entry.is_dir():
+            # Symlinked directories are not followed (os.walk default)
+            if not entry.is_symlink():
+                subdirectories.append(entry.path)
+        elif entry.name.lower().endswith(EXCEL_EXTENSIONS):
+            yield entry.path
+    
+    for subdirectory in subdirectories:
+        yield from _scan_excel_files(subdirectory)
+
+
 def find_excel_files(directory):
     """Find all Excel files in the given directory."""
-    excel_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith(('.xlsx', '.xlsm', '.xls')):
-                excel_files.append(os.path.join(root, file))
-    return excel_files
+    return list(_scan_excel_files(directory))
 
 
 def has_autofilter(sheet):
-    """Check if the sheet has autofilter applied."""
-    return sheet.auto_filter is not None
+    """Check if the sheet has autofilter applied (an AutoFilter object always exists, the ref only when applied)."""
+    return bool(sheet.auto_filter.ref)
 
 
 def search_sheet(sheet, kks_code):
@@ -60,7 +80,8 @@ def search_sheet(sheet, kks_code):
 def process_xlsx_file(filepath, kks_code, csv_writer):
     """Process XLSX/XLSM files and write results to CSV."""
     try:
-        wb = openpyxl.load_workbook(filepath, data_only=True)
+        # Not read_only: read-only sheets do not provide auto_filter, which gives the header row
+        wb = openpyxl.load_workbook(filepath, data_only=True, keep_links=False)
     except Exception as e:
         print(f"Error loading {filepath}: {e}")
         return 0
@@ -100,13 +121,15 @@ def process_xls_file(filepath, kks_code, csv_writer):
         print(f"Error loading {filepath}: {e}")
         return 0
     
+    kks_code_lower = kks_code.lower()
     matches_found = 0
     for sheetname, df in df_dict.items():
-        # Check each row for KKS code matches
-        hit_mask = df.apply(
-            lambda row: row.astype(str).str.lower().str.contains(kks_code.lower()).any(), 
-            axis=1
-        )
+        # Check the cells column by column for KKS code matches; empty cells are masked to ''
+        # after astype(str), which would turn NaN/NaT into 'nan'/'NaT' (like search_sheet)
+        cell_strs = df.astype(str).where(df.notna(), '')
+        hit_mask = np.zeros(len(df), dtype=bool)
+        for _, column in cell_strs.items():
+            hit_mask |= column.str.lower().str.contains(kks_code_lower, regex=False).to_numpy(dtype=bool)
         
         if hit_mask.any():
             # Add source information row
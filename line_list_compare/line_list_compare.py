@@ -13,9 +13,11 @@ Input file must contain 'old' and 'new' sheets with piping data.
 """
 
 import pandas as pd
+from pandas.io.parsers import TextParser
 import numpy as np
 from openpyxl import load_workbook, Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, Protection
+from openpyxl.cell.cell import Cell, TYPE_ERROR, TYPE_NUMERIC
 from openpyxl.comments import Comment
 from openpyxl.utils import get_column_letter
 from copy import copy
@@ -95,7 +97,25 @@ class ExcelTableComparator:
         self.old_data: Optional[pd.DataFrame] = None
         self.new_data: Optional[pd.DataFrame] = None
         self.column_names: List[str] = []
+        self.marker_col = 0
+        self.marker_col_letter = ''
         
+        # Solid background fills by color, shared by all cells of that color
+        self._fills: Dict[str, PatternFill] = {}
+        
+    @classmethod
+    def from_workbooks(cls, old_workbook: Workbook, new_workbook: Workbook,
+                       output_file: str = None) -> 'ExcelTableComparator':
+        """
+        Create a comparator for OLD and NEW workbooks that are already in memory.
+        The first sheet of each workbook is compared, like for files, without saving
+        and loading the workbooks again.
+        """
+        comparator = cls(output_file=output_file)
+        comparator.old_workbook = old_workbook
+        comparator.new_workbook = new_workbook
+        return comparator
+    
     def _detect_german_locale(self) -> bool:
         """Detect if system is German (matches VBA LanguageID intent)."""
         try:
@@ -108,6 +128,13 @@ class ExcelTableComparator:
         """Return localized text based on system language."""
         return german if self.is_german else english
     
+    def _get_fill(self, color: str) -> PatternFill:
+        """Return the shared solid fill for a color (created on first use)."""
+        fill = self._fills.get(color)
+        if fill is None:
+            fill = self._fills[color] = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        return fill
+    
     def _ensure_interface_no_as_string(self) -> None:
         """
         Ensure KKS values are properly formatted as strings.
@@ -145,23 +172,28 @@ class ExcelTableComparator:
         """Load and validate Excel files."""
         self.logger.info("Validating files and loading data...")
         
-        # Load workbooks
-        self.old_workbook = load_workbook(self.old_file, data_only=True)
-        self.new_workbook = load_workbook(self.new_file, data_only=True)
-        
-        # Load data from first sheet of each workbook
-        old_sheet_name = self.old_workbook.sheetnames[0]
-        new_sheet_name = self.new_workbook.sheetnames[0]
-        
-        # Read Excel data with 'KKS' column as string to preserve leading zeros
-        # Use dtype to ensure KKS is read as string
-        try:
-            self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name, dtype={'KKS': str})
-            self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name, dtype={'KKS': str})
-        except (KeyError, ValueError):
-            # Fallback: read normally and then convert KKS column
-            self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name)
-            self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name)
+        if self.old_workbook is not None and self.new_workbook is not None:
+            # Workbooks given in memory (from_workbooks): read data from first sheet of each workbook
+            self.old_data = self._read_sheet_data(self.old_workbook[self.old_workbook.sheetnames[0]])
+            self.new_data = self._read_sheet_data(self.new_workbook[self.new_workbook.sheetnames[0]])
+        else:
+            # Load workbooks
+            self.old_workbook = load_workbook(self.old_file, data_only=True)
+            self.new_workbook = load_workbook(self.new_file, data_only=True)
+            
+            # Load data from first sheet of each workbook
+            old_sheet_name = self.old_workbook.sheetnames[0]
+            new_sheet_name = self.new_workbook.sheetnames[0]
+            
+            # Read Excel data with 'KKS' column as string to preserve leading zeros
+            # Use dtype to ensure KKS is read as string
+            try:
+                self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name, dtype={'KKS': str})
+                self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name, dtype={'KKS': str})
+            except (KeyError, ValueError):
+                # Fallback: read normally and then convert KKS column
+                self.old_data = pd.read_excel(self.old_file, sheet_name=old_sheet_name)
+                self.new_data = pd.read_excel(self.new_file, sheet_name=new_sheet_name)
         
         # Ensure KKS values are properly formatted as strings (preserve leading zeros)
         self._ensure_interface_no_as_string()
@@ -180,9 +212,55 @@ class ExcelTableComparator:
         # Get column names (assuming both tables have same structure)
         self.column_names = list(self.new_data.columns)
         
+        # "Changed" marker column: after data columns + empty column
+        self.marker_col = len(self.column_names) + 2
+        self.marker_col_letter = get_column_letter(self.marker_col)
+        
         self.logger.info(f"Old table: {len(self.old_data)} rows, {len(self.old_data.columns)} columns")
         self.logger.info(f"New table: {len(self.new_data)} rows, {len(self.new_data.columns)} columns")
     
+    def _read_sheet_data(self, worksheet) -> pd.DataFrame:
+        """
+        Read worksheet values into a DataFrame with the first row as header, the same way
+        pd.read_excel does with 'KKS' read as
+        text, like run() does: the cells are converted like pandas' openpyxl
+        reader and parsed by pandas' TextParser (header naming, NA values, type inference).
+        """
+        if hasattr(worksheet, 'reset_dimensions'):
+            # Read-only sheets may report stale dimensions
+            worksheet.reset_dimensions()
+        
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(worksheet.iter_rows()):
+            values = []
+            for cell in row:
+                if cell.value is None:
+                    values.append('')
+                elif cell.data_type == TYPE_ERROR:
+                    values.append(np.nan)
+                elif cell.data_type == TYPE_NUMERIC:
+                    int_value = int(cell.value)
+                    values.append(int_value if int_value == cell.value else float(cell.value))
+                else:
+                    values.append(cell.value)
+            # Trim trailing empty cells
+            while values and values[-1] == '':
+                values.pop()
+            if values:
+                last_row_with_data = row_number
+            data.append(values)
+        
+        # Keep empty rows inside the table: _remove_added_deleted_rows_sections relies on the
+        # first empty KKS to cut off the Added/Deleted Rows sections of a previous comparison
+        data = data[:last_row_with_data + 1]
+        if not data:
+            return pd.DataFrame()
+        
+        width = max(len(values) for values in data)
+        data = [values + [''] * (width - len(values)) for values in data]
+        return TextParser(data, header=0, skip_blank_lines=False, dtype={'KKS': str}).read()
+    
     def _remove_comparison_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Remove the 'Changed' column and any 'Unnamed' columns that are artifacts 
@@ -684,7 +762,16 @@ class ExcelTableComparator:
         return ", ".join(descriptions)
     
     def generate_excel_output(self, new_base_result: ComparisonResult) -> None:
-        """Generate Excel output file with comparison results."""
+        """
+        Generate Excel output file with comparison results.
+        
+        The sheet is written by the same _write_comparison_sheet() that extract_sheets_and_compare()
+        uses on the loaded compare workbook, and the marker column, comments and row heights are
+        filled in after the rows below them, so a write-only workbook can not be used here.
+        For the same reason the sheet is not written with xlsxwriter: it can only create new
+        files (not add a sheet to the compare workbook), and its constant_memory mode also
+        needs the rows in order.
+        """
         self.logger.info("Generating Excel output...")
         
         # Capture formatting from old sheet
@@ -714,6 +801,11 @@ class ExcelTableComparator:
         self._write_data_headers(worksheet, formatting)
         self._write_data_rows(worksheet, result, formatting)
         
+        # Filter out completely empty added/deleted rows once (all values are None, NaN, or empty string),
+        # so the sections, the change markers and the AutoFilter range count the same rows
+        result.added_rows = self._filter_non_empty_rows(result.added_rows)
+        result.deleted_rows = self._filter_non_empty_rows(result.deleted_rows)
+        
         # Added rows section
         if result.added_rows:
             self._write_added_rows_section(worksheet, result)
@@ -771,9 +863,9 @@ class ExcelTableComparator:
         worksheet.cell(1, 6, self._get_localized_text("Deleted", "Gelöscht"))
         
         # Apply background colors to match the change types
-        worksheet.cell(1, 4).fill = PatternFill(start_color=Colors.YELLOW, end_color=Colors.YELLOW, fill_type='solid')
-        worksheet.cell(1, 5).fill = PatternFill(start_color=Colors.GREEN, end_color=Colors.GREEN, fill_type='solid')
-        worksheet.cell(1, 6).fill = PatternFill(start_color=Colors.RED, end_color=Colors.RED, fill_type='solid')
+        worksheet.cell(1, 4).fill = self._get_fill(Colors.YELLOW)
+        worksheet.cell(1, 5).fill = self._get_fill(Colors.GREEN)
+        worksheet.cell(1, 6).fill = self._get_fill(Colors.RED)
     
     def _write_data_headers(self, worksheet, formatting: dict) -> None:
         """Write column headers in row 2 with formatting from old sheet."""
@@ -820,6 +912,10 @@ class ExcelTableComparator:
     
     def _write_data_rows(self, worksheet, result: ComparisonResult, formatting: dict) -> None:
         """Write data rows with colors, comments, and formatting from old sheet."""
+        # All data cells of column 2 get the same template font, so the duplicate font is built
+        # once from the first duplicate cell and reused for the others
+        duplicate_font = None
+        
         for row_idx in range(len(result.data)):
             excel_row = row_idx + 3  # Start from row 3
             
@@ -858,8 +954,7 @@ class ExcelTableComparator:
                 
                 # Apply colors (this may override some formatting like fill)
                 if (row_idx, col_name) in result.colors:
-                    color = result.colors[(row_idx, col_name)]
-                    cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+                    cell.fill = self._get_fill(result.colors[(row_idx, col_name)])
                 
                 # Apply comments
                 if (row_idx, col_name) in result.comments:
@@ -871,94 +966,65 @@ class ExcelTableComparator:
             # Preserve existing font attributes but change color to dark red
             if row_idx in result.duplicate_rows:
                 dup_cell = worksheet.cell(row=excel_row, column=2)
-                existing_font = dup_cell.font
-                dup_cell.font = Font(
-                    name=existing_font.name,
-                    size=existing_font.size,
-                    bold=existing_font.bold,
-                    italic=existing_font.italic,
-                    color=Colors.DARK_RED
-                )
+                if duplicate_font is None:
+                    existing_font = dup_cell.font
+                    duplicate_font = Font(
+                        name=existing_font.name,
+                        size=existing_font.size,
+                        bold=existing_font.bold,
+                        italic=existing_font.italic,
+                        color=Colors.DARK_RED
+                    )
+                dup_cell.font = duplicate_font
     
     def _write_added_rows_section(self, worksheet, result: ComparisonResult) -> None:
-        """Write added rows section at the bottom."""
-        # Filter out completely empty rows (all values are None, NaN, or empty string)
-        non_empty_added_rows = []
-        for row_data in result.added_rows:
-            # Check if at least one value is non-empty
-            has_content = any(
-                pd.notna(row_data.get(col)) and str(row_data.get(col)).strip() != ''
-                for col in self.column_names
-            )
-            if has_content:
-                non_empty_added_rows.append(row_data)
-        
-        # If no non-empty added rows, skip this section entirely
-        if not non_empty_added_rows:
-            return
-        
+        """Write added rows section at the bottom (empty rows are already filtered out)."""
         start_row = len(result.data) + 5  # Leave some space
         
-        # Section header
+        # Added row data with GREEN background
         header_text = self._get_localized_text("Added Rows", "Hinzugefügte Zeilen")
-        worksheet.cell(start_row, 1, header_text)
-        
-        # Column headers
-        for col_idx, col_name in enumerate(self.column_names, start=1):
-            worksheet.cell(start_row + 1, col_idx, col_name)
-        
-        # Added row data with GREEN background (only non-empty rows)
-        for idx, row_data in enumerate(non_empty_added_rows):
-            excel_row = start_row + 2 + idx
-            for col_idx, col_name in enumerate(self.column_names, start=1):
-                cell = worksheet.cell(excel_row, col_idx)
-                value = row_data.get(col_name, "")
-                
-                # Special handling for KKS to preserve leading zeros
-                if col_name == 'KKS' and pd.notna(value) and value != "":
-                    cell.value = str(value)
-                    cell.number_format = '@'
-                else:
-                    cell.value = value
-                
-                # Apply GREEN background to added rows
-                cell.fill = PatternFill(start_color=Colors.GREEN, end_color=Colors.GREEN, fill_type='solid')
+        self._append_rows_section(worksheet, start_row, header_text, result.added_rows, Colors.GREEN)
     
     def _write_deleted_rows_section(self, worksheet, result: ComparisonResult) -> None:
-        """Write deleted rows section at the bottom."""
-        # Filter out completely empty rows (all values are None, NaN, or empty string)
-        non_empty_deleted_rows = []
-        for row_data in result.deleted_rows:
-            # Check if at least one value is non-empty
-            has_content = any(
-                pd.notna(row_data.get(col)) and str(row_data.get(col)).strip() != ''
-                for col in self.column_names
-            )
-            if has_content:
-                non_empty_deleted_rows.append(row_data)
-        
-        # If no non-empty deleted rows, skip this section entirely
-        if not non_empty_deleted_rows:
-            return
-        
+        """Write deleted rows section at the bottom (empty rows are already filtered out)."""
         # Calculate start row based on whether added rows exist
         start_row = len(result.data) + 5
         if result.added_rows:
             start_row += len(result.added_rows) + 4  # Added rows + header + spacing
         
-        # Section header
+        # Deleted row data with RED background
         header_text = self._get_localized_text("Deleted Rows", "Gelöschte Zeilen")
-        worksheet.cell(start_row, 1, header_text)
+        self._append_rows_section(worksheet, start_row, header_text, result.deleted_rows, Colors.RED)
+    
+    def _filter_non_empty_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the rows that have at least one non-empty value (checked for all cells at once)."""
+        if not rows:
+            return []
+        
+        values = pd.DataFrame(rows, columns=self.column_names)
+        has_text = np.char.strip(values.astype(str).to_numpy(dtype=str)) != ''
+        has_content = (values.notna().to_numpy() & has_text).any(axis=1)
+        return [row_data for row_data, keep in zip(rows, has_content.tolist()) if keep]
+    
+    def _append_rows_section(self, worksheet, start_row: int, header_text: str,
+                             rows: List[Dict[str, Any]], color: str) -> None:
+        """
+        Append a section (header text, column headers, rows with colored background) at start_row.
+        The section is below everything written so far, so the rows are added with
+        worksheet.append() after blank rows up to start_row.
+        """
+        for _ in range(start_row - worksheet.max_row - 1):
+            worksheet.append([])
         
-        # Column headers
-        for col_idx, col_name in enumerate(self.column_names, start=1):
-            worksheet.cell(start_row + 1, col_idx, col_name)
+        # Section header and column headers
+        worksheet.append([header_text])
+        worksheet.append(self.column_names)
         
-        # Deleted row data with RED background (only non-empty rows)
-        for idx, row_data in enumerate(non_empty_deleted_rows):
-            excel_row = start_row + 2 + idx
-            for col_idx, col_name in enumerate(self.column_names, start=1):
-                cell = worksheet.cell(excel_row, col_idx)
+        fill = self._get_fill(color)
+        for row_data in rows:
+            row_cells = []
+            for col_name in self.column_names:
+                cell = Cell(worksheet)
                 value = row_data.get(col_name, "")
                 
                 # Special handling for KKS to preserve leading zeros
@@ -968,16 +1034,17 @@ class ExcelTableComparator:
                 else:
                     cell.value = value
                 
-                # Apply RED background to deleted rows
-                cell.fill = PatternFill(start_color=Colors.RED, end_color=Colors.RED, fill_type='solid')
+                cell.fill = fill
+                row_cells.append(cell)
+            
+            worksheet.append(row_cells)
     
     def _write_change_marker_column(self, worksheet, result: ComparisonResult) -> None:
         """Write change marker column."""
-        marker_col = len(self.column_names) + 2  # After data columns + empty column
+        marker_col = self.marker_col
         
         # Set column width to 16 for the "Changed" column
-        marker_col_letter = get_column_letter(marker_col)
-        worksheet.column_dimensions[marker_col_letter].width = 16
+        worksheet.column_dimensions[self.marker_col_letter].width = 16
         
         # Header
         header_text = self._get_localized_text("Changed", "Geändert")
@@ -1006,15 +1073,13 @@ class ExcelTableComparator:
     
     def _apply_autofilter(self, worksheet, result: ComparisonResult) -> None:
         """Apply AutoFilter to the data range."""
-        marker_col = len(self.column_names) + 2
         last_row = len(result.data) + 3
         if result.added_rows:
             last_row += len(result.added_rows) + 3
         if result.deleted_rows:
             last_row += len(result.deleted_rows) + 3
         
-        last_col_letter = get_column_letter(marker_col)
-        worksheet.auto_filter.ref = f"A2:{last_col_letter}{last_row}"
+        worksheet.auto_filter.ref = f"A2:{self.marker_col_letter}{last_row}"
     
     def run(self) -> None:
         """Execute complete comparison workflow."""
@@ -1085,7 +1150,7 @@ def extract_sheets_and_compare(compare_file, output_file=None):
         print(f"📊 OLD sheet: '{old_sheet_name}'")
         print(f"📊 NEW sheet: '{new_sheet_name}'")
         
-        # Create temporary old.xlsx and new.xlsx files
+        # Create in-memory old and new workbooks (first sheet of each is compared)
         print("📋 Extracting sheets...")
         
         # Helper function to check if a row is a legend row
@@ -1094,7 +1159,7 @@ def extract_sheets_and_compare(compare_file, output_file=None):
             row_values = [str(cell.value).strip() for cell in row if cell.value is not None]
             return any(keyword in row_values for keyword in legend_keywords)
         
-        # Create old.xlsx with formatting
+        # Create old workbook with formatting
         wb_old = Workbook()
         wb_old.remove(wb_old.active)
         old_sheet = wb_old.create_sheet("Old Table")
@@ -1116,14 +1181,22 @@ def extract_sheets_and_compare(compare_file, output_file=None):
                     interface_no_col = cell.column
                     break
         
+        # Copied style objects by source style id: cells sharing a style in the source sheet share
+        # one set of copies (copy() is still needed, the source StyleProxy objects can not be
+        # assigned to cells of another workbook)
+        copied_styles = {}
+        
         # Copy data and formatting from compare.xlsx old sheet (skipping legend if present)
         for row_idx, row in enumerate(rows_to_copy[start_row:], start=1):
             for cell in row:
                 # Map to new position (row_idx instead of original row number)
                 new_cell = old_sheet.cell(row=row_idx, column=cell.column)
                 
+                # Formulas have no value here (the compare workbook is not loaded with data_only)
+                if cell.data_type == 'f':
+                    new_cell.value = None
                 # Special handling for KKS column to preserve leading zeros
-                if cell.column == interface_no_col and cell.value is not None:
+                elif cell.column == interface_no_col and cell.value is not None:
                     # Preserve as string and set text format
                     new_cell.value = str(cell.value)
                     new_cell.number_format = '@'
@@ -1132,30 +1205,30 @@ def extract_sheets_and_compare(compare_file, output_file=None):
                 
                 # Copy cell formatting
                 if cell.has_style:
-                    new_cell.font = copy(cell.font)
-                    new_cell.border = copy(cell.border)
-                    new_cell.fill = copy(cell.fill)
-                    new_cell.number_format = copy(cell.number_format)
-                    new_cell.protection = copy(cell.protection)
-                    new_cell.alignment = copy(cell.alignment)
+                    style = copied_styles.get(cell.style_id)
+                    if style is None:
+                        style = copied_styles[cell.style_id] = (
+                            copy(cell.font), copy(cell.border), copy(cell.fill),
+                            cell.number_format, copy(cell.protection), copy(cell.alignment)
+                        )
+                    (new_cell.font, new_cell.border, new_cell.fill,
+                     new_cell.number_format, new_cell.protection, new_cell.alignment) = style
         
         # Copy column widths
-        for col_letter in compare_old_sheet.column_dimensions:
-            if compare_old_sheet.column_dimensions[col_letter].width:
-                old_sheet.column_dimensions[col_letter].width = compare_old_sheet.column_dimensions[col_letter].width
+        for col_letter, dimension in compare_old_sheet.column_dimensions.items():
+            if dimension.width:
+                old_sheet.column_dimensions[col_letter].width = dimension.width
         
         # Copy row heights
-        for row_num in compare_old_sheet.row_dimensions:
-            if compare_old_sheet.row_dimensions[row_num].height:
-                old_sheet.row_dimensions[row_num].height = compare_old_sheet.row_dimensions[row_num].height
+        for row_num, dimension in compare_old_sheet.row_dimensions.items():
+            if dimension.height:
+                old_sheet.row_dimensions[row_num].height = dimension.height
         
         # Copy freeze panes
         if compare_old_sheet.freeze_panes:
             old_sheet.freeze_panes = compare_old_sheet.freeze_panes
         
-        wb_old.save("temp_old.xlsx")
-        
-        # Create new.xlsx (formatting not needed as we use old sheet formatting)
+        # Create new workbook (formatting not needed as we use old sheet formatting)
         wb_new = Workbook()
         wb_new.remove(wb_new.active)
         new_sheet = wb_new.create_sheet("New Table")
@@ -1182,21 +1255,22 @@ def extract_sheets_and_compare(compare_file, output_file=None):
             for cell in row:
                 new_cell = new_sheet.cell(row=row_idx, column=cell.column)
                 
+                # Formulas have no value here (the compare workbook is not loaded with data_only)
+                if cell.data_type == 'f':
+                    new_cell.value = None
                 # Special handling for KKS column to preserve leading zeros
-                if cell.column == interface_no_col_new and cell.value is not None:
+                elif cell.column == interface_no_col_new and cell.value is not None:
                     new_cell.value = str(cell.value)
                     new_cell.number_format = '@'
                 else:
                     new_cell.value = cell.value
         
-        wb_new.save("temp_new.xlsx")
-        
         # Run the comparator
         print("🚀 Running comparison (KKS-based)...")
         
-        comparator = ExcelTableComparator(
-            old_file='temp_old.xlsx',
-            new_file='temp_new.xlsx', 
+        comparator = ExcelTableComparator.from_workbooks(
+            wb_old,
+            wb_new,
             output_file=None  # Will be written back to input file
         )
         
@@ -1238,19 +1312,12 @@ def extract_sheets_and_compare(compare_file, output_file=None):
         # Save back to the input file
         wb_compare.save(compare_file)
         
-        # Clean up temporary files
-        Path("temp_old.xlsx").unlink(missing_ok=True)
-        Path("temp_new.xlsx").unlink(missing_ok=True)
-        
         print(f"✅ Success! New sheet '{sheet_name}' added to: {compare_file}")
         print("📊 Contains comparison with change analysis")
         return True
         
     except Exception as e:
         print(f"❌ Error: {e}")
-        # Clean up on error
-        Path("temp_old.xlsx").unlink(missing_ok=True)
-        Path("temp_new.xlsx").unlink(missing_ok=True)
         return False
 
 
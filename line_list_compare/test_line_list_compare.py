@@ -0,0 +1,93 @@
+"""
+Tests for loading the compared tables in line_list_compare.py
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+# Add this directory to path to import the module
+sys.path.insert(0, str(Path(__file__).parent))
+
+from line_list_compare import ExcelTableComparator, extract_sheets_and_compare
+
+
+HEADER = ["KKS", "Medium"]
+
+# A previous comparison output: data rows, blank spacing rows and a "Deleted Rows" section
+PREVIOUS_OUTPUT_ROWS = [
+    HEADER,
+    ["10ABC01", "Water"],
+    ["10ABC02", "Steam"],
+    [None, None],
+    [None, None],
+    ["Deleted Rows", None],
+    HEADER,
+    ["10ABC03", "Oil"],
+]
+
+
+def create_test_workbook(rows, title="Sheet"):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    for row in rows:
+        ws.append(row)
+    return wb
+
+
+@pytest.fixture(autouse=True)
+def work_in_tmp_path(tmp_path, monkeypatch):
+    # The comparator writes comparison.log to the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def test_read_sheet_data_matches_read_excel(tmp_path):
+    """Values, header names and blank rows come out exactly as pd.read_excel (run()) reads them"""
+    wb = create_test_workbook([
+        ["KKS", "Medium", None, "Medium", "PS [bar(g)]"],
+        ["0010ABC01", "N/A", 1.5, "Water", "0042"],
+        [None, None, None, None, None],
+        [10, "Steam", None, None, "16"],
+        ["10ABC03", None, 2.0, "NULL", "2.5"],
+        [None, None, None, None, None],
+    ])
+    wb.save(tmp_path / "sheet.xlsx")
+
+    df = ExcelTableComparator()._read_sheet_data(wb.active)
+    expected = pd.read_excel(tmp_path / "sheet.xlsx", dtype={'KKS': str})
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.iloc[1].isna().all()
+
+
+def test_in_memory_compare_removes_previous_output_section():
+    """The in-memory workbooks are cut at the first empty KKS, like files read by run()"""
+    old_wb = create_test_workbook([HEADER, ["10ABC01", "Water"], ["10ABC02", "Steam"]])
+    new_wb = create_test_workbook(PREVIOUS_OUTPUT_ROWS)
+
+    comparator = ExcelTableComparator.from_workbooks(old_wb, new_wb, output_file="out.xlsx")
+    comparator.validate_files_and_load_data()
+
+    assert comparator.old_data["KKS"].tolist() == ["10ABC01", "10ABC02"]
+    assert comparator.new_data["KKS"].tolist() == ["10ABC01", "10ABC02"]
+
+
+def test_extract_sheets_and_compare_with_previous_output(tmp_path):
+    """Re-comparing an earlier output sheet does not bring its sections back as data rows"""
+    wb = create_test_workbook(PREVIOUS_OUTPUT_ROWS, title="old")
+    new_ws = wb.create_sheet("new")
+    for row in [HEADER, ["10ABC01", "Water"], ["10ABC02", "Steam"]]:
+        new_ws.append(row)
+    compare_file = tmp_path / "compare.xlsx"
+    wb.save(compare_file)
+
+    assert extract_sheets_and_compare(str(compare_file)) is not False
+
+    # Only the two data rows are written below the legend and header rows, without a Deleted Rows section
+    result_ws = load_workbook(compare_file).worksheets[-1]
+    kks_values = [row[0] for row in result_ws.iter_rows(min_row=3, values_only=True)]
+    assert [value for value in kks_values if value is not None] == ["10ABC01", "10ABC02"]